@@ -0,0 +1,204 @@
+"""
+卧底游戏插件压测脚本。
+
+在本地启动 NoneBot，使用模拟的 OneBot V11 机器人（可配置接口延迟），
+让大量群同时完成 创建 -> 加入 -> 启动 -> 讨论 -> 投票 -> 结束 的完整流程，
+输出事件处理耗时的 p50/p99、消息发送速率以及每局游戏占用的内存。
+
+用法:
+    python benchmarks/spy_game.py --groups 1000 --players 6 --latency 0.02
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from pathlib import Path
+from statistics import quantiles
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import nonebot
+from nonebot.message import handle_event
+from nonebot.adapters.onebot.v11 import Adapter, Bot, Message
+from nonebot.adapters.onebot.v11.event import GroupMessageEvent, PrivateMessageEvent
+
+SELF_ID = 10000
+
+
+class FakeBot(Bot):
+    """
+    模拟的 OneBot V11 机器人，按配置的延迟应答接口调用并统计发送的消息。
+    """
+
+    def __init__(self, adapter: Adapter, self_id: str, latency: float, friends: set[int]):
+        super().__init__(adapter, self_id)
+        self.latency = latency
+        self.friends = friends
+        self.sent = 0
+        self.api_calls: dict[str, int] = {}
+
+    async def call_api(self, api: str, **data):
+        self.api_calls[api] = self.api_calls.get(api, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if api == "get_friend_list":
+            return [{"user_id": user_id, "nickname": "", "remark": ""} for user_id in self.friends]
+        if api in ("send_group_msg", "send_private_msg"):
+            self.sent += 1
+            return {"message_id": self.sent}
+        return None
+
+
+class Runner:
+    def __init__(self, bot: FakeBot, rounds: int):
+        self.bot = bot
+        self.rounds = rounds
+        self.latencies: list[float] = []
+        self.message_id = 0
+
+    async def dispatch(self, event):
+        start = time.perf_counter()
+        await handle_event(self.bot, event)
+        self.latencies.append(time.perf_counter() - start)
+
+    def group_message(self, group_id: int, user_id: int, text: str) -> GroupMessageEvent:
+        self.message_id += 1
+        return GroupMessageEvent(time=int(time.time()), self_id=SELF_ID, post_type="message", sub_type="normal",
+                                 user_id=user_id, message_type="group", message_id=self.message_id,
+                                 message=Message(text), original_message=Message(text), raw_message=text, font=0,
+                                 sender={"user_id": user_id, "role": "member"}, group_id=group_id, to_me=False)
+
+    def private_message(self, user_id: int, text: str) -> PrivateMessageEvent:
+        self.message_id += 1
+        return PrivateMessageEvent(time=int(time.time()), self_id=SELF_ID, post_type="message", sub_type="friend",
+                                   user_id=user_id, message_type="private", message_id=self.message_id,
+                                   message=Message(text), original_message=Message(text), raw_message=text, font=0,
+                                   sender={"user_id": user_id}, to_me=True)
+
+    async def lobby(self, group_id: int, user_ids: list[int]):
+        host = user_ids[0]
+        await self.dispatch(self.group_message(group_id, host, "/卧底游戏 创建"))
+        for user_id in user_ids[1:]:
+            await self.dispatch(self.group_message(group_id, user_id, "/卧底游戏 加入"))
+
+    async def play(self, group_id: int, user_ids: list[int]):
+        from zako.plugins.spy_game.registry import registry
+
+        host = user_ids[0]
+        await self.dispatch(self.group_message(group_id, host, "/卧底游戏 启动"))
+        game = registry.get(group_id)
+
+        while registry.get(group_id) is game and game is not None:
+            # 讨论：每个存活玩家发言若干次，发言不包含任何汉字，不会触发词汇
+            alive = [player.get_user_id() for player in game.get_alive_players()]
+            for _ in range(self.rounds):
+                for user_id in alive:
+                    await self.dispatch(self.group_message(group_id, user_id, "？？"))
+
+            # 投票：所有人投给座位号最小的其他存活玩家
+            await self.dispatch(self.group_message(group_id, host, "结束讨论"))
+            seats = sorted(player.get_seat() for player in game.get_alive_players())
+            for player in list(game.get_alive_players()):
+                target = seats[0] if seats[0] != player.get_seat() else seats[1]
+                await self.dispatch(self.private_message(player.get_user_id(), str(target)))
+
+
+def percentile(samples: list[float], p: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return quantiles(samples, n=100)[p - 1]
+
+
+async def run(args):
+    random.seed(args.seed)
+    driver = nonebot.get_driver()
+    adapter = next(iter(driver._adapters.values()))
+
+    user_ids = {
+        group_id: [group_id * 100 + index for index in range(args.players)]
+        for group_id in range(1, args.groups + 1)
+    }
+    friends = {user_id for group in user_ids.values() for user_id in group}
+    bot = FakeBot(adapter, str(SELF_ID), args.latency, friends)
+
+    await driver._lifespan.startup()
+    driver._bot_connect(bot)
+    await asyncio.sleep(0.1)
+
+    from zako.plugins.spy_game.registry import registry
+    from zako.plugins.spy_game.scheduler import scheduler
+    from zako.plugins.spy_game import private_fanout
+
+    runner = Runner(bot, args.rounds)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await asyncio.gather(*(runner.lobby(group_id, users) for group_id, users in user_ids.items()))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    lobby_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    live_games = registry.get_live_total()
+
+    start = time.perf_counter()
+    sent_before = bot.sent
+    await asyncio.gather(*(runner.play(group_id, users) for group_id, users in user_ids.items()))
+    while scheduler.get_depth():
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    await driver._lifespan.shutdown()
+
+    latencies = runner.latencies
+    report = [
+        f"groups={args.groups} players={args.players} latency={args.latency * 1000:.0f}ms seed={args.seed}",
+        f"events={len(latencies)} handler_p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"handler_p99={percentile(latencies, 99) * 1000:.2f}ms",
+        f"elapsed={elapsed:.2f}s messages={bot.sent - sent_before} "
+        f"messages_per_second={(bot.sent - sent_before) / elapsed:.1f}",
+        f"live_games_after_lobby={live_games} memory_per_game={lobby_bytes / max(live_games, 1) / 1024:.1f}KiB",
+        f"api_calls={bot.api_calls}",
+        f"games_left={registry.get_live_total()} "
+        f"scheduler={ {name: str(value) for name, value in scheduler.get_metrics().items()} }",
+        f"fanout={private_fanout.get_latency()} fanout_failures={private_fanout.get_failures()}",
+    ]
+    print("\n".join(report))
+    if args.output:
+        Path(args.output).write_text("\n".join(report) + "\n", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="卧底游戏插件压测")
+    parser.add_argument("--groups", type=int, default=1000, help="同时进行游戏的群数量")
+    parser.add_argument("--players", type=int, default=6, help="每局游戏的玩家数量")
+    parser.add_argument("--rounds", type=int, default=2, help="每轮讨论中每名玩家的发言次数")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟接口调用延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", help="将结果写入文件")
+    args = parser.parse_args()
+
+    # 词库等数据文件使用相对于项目根目录的路径
+    os.chdir(ROOT)
+
+    # 压测时不限制发送速率，也不写入游戏日志和对局事件日志
+    nonebot.init(command_sep={" "},
+                 log_level="WARNING",
+                 spy_game_send_rate=1e9,
+                 spy_game_send_burst=1_000_000,
+                 spy_game_send_concurrency=1024,
+                 spy_game_send_queue_size=1_000_000,
+                 spy_game_fanout_rate=1e9,
+                 spy_game_fanout_concurrency=64,
+                 spy_game_vote_timeout=0,
+                 spy_game_journal_path="",
+                 spy_game_event_log_path="")
+    nonebot.get_driver().register_adapter(Adapter)
+    nonebot.load_plugins("zako/plugins")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+离线分析卧底游戏插件记录的对局事件。
+
+按块读取事件日志，使用 NumPy 按列统计:
+各词对的对局数、卧底胜率与触发词汇率，不同人数下的胜率，以及每轮讨论和投票的时长分布。
+需要安装 numpy。
+
+用法:
+    python scripts/analyze_events.py data/spy_game_events.bin --min-games 20 --top 10
+"""
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from plugin_modules import import_module
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def read_chunks(path: str, dtype, chunk_size: int):
+    with open(path, "rb") as file:
+        while True:
+            chunk = np.fromfile(file, dtype=dtype, count=chunk_size)
+            if not len(chunk):
+                return
+            yield chunk
+
+
+def read_pairs(path: str) -> list[tuple[str, str]]:
+    try:
+        with open(f"{path}.pairs", "r", encoding="utf-8") as file:
+            return [tuple(json.loads(line)) for line in file]
+    except FileNotFoundError:
+        return []
+
+
+def join(game_ids, keys, values):
+    """
+    按游戏编号查找 keys 中对应的 values，返回找到的位置掩码与对应的值。
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    index = np.searchsorted(sorted_keys, game_ids)
+    index = np.minimum(index, max(len(sorted_keys) - 1, 0))
+    found = (sorted_keys[index] == game_ids) if len(sorted_keys) else np.zeros(len(game_ids), dtype=bool)
+    return found, values[order][index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析卧底游戏对局事件")
+    parser.add_argument("path", nargs="?", default="data/spy_game_events.bin", help="事件日志路径")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="每次读取的事件条数")
+    parser.add_argument("--min-games", type=int, default=20, help="参与词对排名的最少对局数")
+    parser.add_argument("--top", type=int, default=10, help="输出卧底胜率最高和最低的词对数量")
+    parser.add_argument("--csv", help="将每个词对的统计写入 CSV 文件")
+    args = parser.parse_args()
+
+    if np is None:
+        sys.exit("需要安装 numpy: pip install numpy")
+
+    os.chdir(ROOT)
+    eventformat = import_module("eventformat")
+    RECORD, RECORD_DTYPE, EventKind, Winner = \
+        eventformat.RECORD, eventformat.RECORD_DTYPE, eventformat.EventKind, eventformat.Winner
+
+    dtype = np.dtype(RECORD_DTYPE)
+    assert dtype.itemsize == RECORD.size
+
+    # 每块只保留需要的列，对局级别的事件远少于全部事件
+    starts, finishes, triggers, rounds = [], [], [], []
+    total = 0
+    for chunk in read_chunks(args.path, dtype, args.chunk_size):
+        total += len(chunk)
+        kind = chunk["kind"]
+        selected = chunk[kind == EventKind.START]
+        starts.append(np.stack([selected["game_id"], selected["a"], selected["b"]], axis=1))
+        selected = chunk[kind == EventKind.FINISH]
+        finishes.append(np.stack([selected["game_id"], selected["a"]], axis=1))
+        triggers.append(chunk["game_id"][kind == EventKind.TRIGGER])
+        selected = chunk[kind == EventKind.ROUND]
+        rounds.append(np.stack([selected["a"], selected["b"]], axis=1))
+
+    if not total:
+        sys.exit(f"{args.path} 中没有事件")
+
+    starts = np.concatenate(starts)
+    finishes = np.concatenate(finishes)
+    triggers = np.unique(np.concatenate(triggers))
+    rounds = np.concatenate(rounds)
+    pairs = read_pairs(args.path)
+    pair_total = max(len(pairs), int(starts[:, 2].max()) + 1 if len(starts) else 0)
+
+    # 将结束事件与开始事件按游戏编号关联，得到每局的词对和人数
+    found, start_rows = join(finishes[:, 0], starts[:, 0], starts)
+    finishes, start_rows = finishes[found], start_rows[found]
+    winner = finishes[:, 1]
+    pair_ids = start_rows[:, 2]
+    players = start_rows[:, 1]
+    finished = winner != Winner.ABANDONED
+    spy_win = (winner == Winner.SPY).astype(np.int64)
+    triggered = np.isin(finishes[:, 0], triggers).astype(np.int64)
+
+    games = np.bincount(pair_ids[finished], minlength=pair_total)
+    spy_wins = np.bincount(pair_ids[finished], weights=spy_win[finished], minlength=pair_total)
+    trigger_games = np.bincount(pair_ids[finished], weights=triggered[finished], minlength=pair_total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spy_rate = spy_wins / games
+        trigger_rate = trigger_games / games
+
+    print(f"事件 {total} 条，开始 {len(starts)} 局，结束 {int(finished.sum())} 局，"
+          f"无人操作结束 {int((~finished).sum())} 局")
+
+    def pair_name(pair_id) -> str:
+        return "/".join(pairs[pair_id]) if pair_id < len(pairs) else f"#{pair_id}"
+
+    ranked = np.flatnonzero(games >= args.min_games)
+    ranked = ranked[np.argsort(spy_rate[ranked], kind="stable")]
+    if len(ranked):
+        print(f"\n卧底胜率最高的词对（卧底太容易隐藏，至少 {args.min_games} 局）:")
+        for pair_id in ranked[::-1][:args.top]:
+            print(f"  {pair_name(pair_id)}: {spy_rate[pair_id]:.1%}，{games[pair_id]} 局，触发词汇 {trigger_rate[pair_id]:.1%}")
+        print("\n卧底胜率最低的词对（卧底太容易暴露）:")
+        for pair_id in ranked[:args.top]:
+            print(f"  {pair_name(pair_id)}: {spy_rate[pair_id]:.1%}，{games[pair_id]} 局，触发词汇 {trigger_rate[pair_id]:.1%}")
+
+    print("\n不同人数的对局:")
+    player_games = np.bincount(players[finished])
+    player_spy_wins = np.bincount(players[finished], weights=spy_win[finished], minlength=len(player_games))
+    for player_total in np.flatnonzero(player_games):
+        print(f"  {player_total} 人: {player_games[player_total]} 局，"
+              f"卧底胜率 {player_spy_wins[player_total] / player_games[player_total]:.1%}")
+
+    if len(rounds):
+        seconds = rounds[:, 1] / 1000
+        outcomes = np.bincount(rounds[:, 0], minlength=3)
+        p50, p90, p99 = np.percentile(seconds, [50, 90, 99])
+        print(f"\n每轮时长: {len(rounds)} 轮，p50={p50:.0f}s p90={p90:.0f}s p99={p99:.0f}s，"
+              f"有人出局 {outcomes[0]} 轮，平票 {outcomes[1]} 轮，无人投票 {outcomes[2]} 轮")
+        bins = np.array([0, 30, 60, 120, 300, 600, 1200, np.inf])
+        counts, _ = np.histogram(seconds, bins=bins)
+        for low, high, count in zip(bins[:-1], bins[1:], counts):
+            label = f"{low:.0f}s 以上" if np.isinf(high) else f"{low:.0f}-{high:.0f}s"
+            print(f"  {label}: {count}")
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8") as file:
+            file.write("civilian,spy,games,spy_win_rate,trigger_rate\n")
+            for pair_id in np.flatnonzero(games):
+                civilian_word, spy_word = pairs[pair_id] if pair_id < len(pairs) else ("", "")
+                file.write(f"{civilian_word},{spy_word},{games[pair_id]},"
+                           f"{spy_rate[pair_id]:.4f},{trigger_rate[pair_id]:.4f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+将 JSON 词库编译为卧底游戏插件使用的二进制词库。
+
+编译后的词库通过内存映射读取，抽取词对时无需解析整个词库。
+将 SPY_GAME_WORD_PATH 配置为输出文件的路径即可启用，
+运行中的机器人会在文件被替换后自动重新加载。
+
+用法:
+    python scripts/build_words.py data/words.json data/words.bin
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from plugin_modules import import_module
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编译卧底游戏词库")
+    parser.add_argument("source", nargs="?", default="data/words.json", help="JSON 词库路径")
+    parser.add_argument("output", nargs="?", default="data/words.bin", help="二进制词库输出路径")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    wordstore = import_module("wordstore")
+    WordStore, build_from_json = wordstore.WordStore, wordstore.build_from_json
+
+    pair_total = build_from_json(args.source, args.output)
+    store = WordStore(args.output)
+    try:
+        categories = store.get_categories()
+        print(f"已写入 {args.output}: {len(categories)} 个分类，{pair_total} 组词对，"
+              f"{os.path.getsize(args.output)} 字节")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
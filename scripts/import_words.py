@@ -0,0 +1,86 @@
+"""
+将 CSV / TSV / JSONL 格式的词对导入卧底游戏插件的词库。
+
+每行一组词对，格式为 "词1,词2" 或 "分类,词1,词2"，JSONL 文件每行为
+["词1", "词2"]、["分类", "词1", "词2"] 或 {"category": "分类", "words": ["词1", "词2"]}。
+两个词必须不同，且不能互相触发（按当前的触发词汇判定方式），已存在于任意分类中的词对会被跳过。
+校验通过的词对与已有词库合并后整体写入，运行中的机器人会自动重新加载。
+
+用法:
+    python scripts/import_words.py new_words.csv more_words.jsonl --category 默认
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import nonebot
+from plugin_modules import import_module
+
+# 导入结果对应的说明
+RESULTS = {
+    0: "导入成功",
+    1: "无法解析",
+    2: "词汇为空",
+    3: "两个词相同",
+    4: "两个词会互相触发",
+    5: "词对已存在"
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入卧底游戏词库")
+    parser.add_argument("sources", nargs="+", help="要导入的 CSV / TSV / JSONL 文件")
+    parser.add_argument("--format", choices=["csv", "tsv", "jsonl"], help="文件格式，默认按扩展名判断")
+    parser.add_argument("--category", default="默认", help="未指定分类的词对导入到的分类")
+    parser.add_argument("--output", help="词库路径，默认为 SPY_GAME_WORD_PATH")
+    parser.add_argument("--mode", choices=["char", "word", "pinyin"], help="触发词汇的判定方式，默认为 SPY_GAME_TRIGGER_MODE")
+    parser.add_argument("--replace", action="store_true", help="不合并已有词库，只写入本次导入的词对")
+    parser.add_argument("--dry-run", action="store_true", help="只校验，不写入词库")
+    parser.add_argument("--max-errors", type=int, default=20, help="最多输出的错误行数")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    # 词库路径与触发词汇判定方式的默认值取自 .env 中的插件配置
+    nonebot.init(log_level="WARNING")
+    plugin_config = import_module("config").plugin_config
+    MatchMode = import_module("trigger").MatchMode
+    WordImporter = import_module("importer").WordImporter
+
+    output = args.output or plugin_config.spy_game_word_path
+    mode = MatchMode(args.mode) if args.mode else plugin_config.spy_game_trigger_mode
+    importer = WordImporter(mode, args.category)
+    if not args.replace and os.path.exists(output):
+        importer.load(output)
+    existing = importer.get_pair_total()
+    if importer.get_duplicate_total():
+        print(f"已有词库中有 {importer.get_duplicate_total()} 组重复的词对，已原样保留")
+
+    counts = {result: 0 for result in RESULTS}
+    errors = 0
+    for source in args.sources:
+        for line, result in importer.read(source, args.format):
+            counts[result] += 1
+            # 词对已存在不算错误，只统计数量
+            if result in (0, 5):
+                continue
+            errors += 1
+            if errors <= args.max_errors:
+                print(f"{source}:{line}: {RESULTS[result]}")
+
+    print("，".join(f"{RESULTS[result]} {count} 行" for result, count in counts.items()))
+    if args.dry_run:
+        return
+    if not counts[0] and not args.replace:
+        print("没有新的词对，词库未修改")
+        return
+
+    pair_total = importer.write(output)
+    print(f"已写入 {output}: {len(importer.get_categories())} 个分类，{pair_total} 组词对（原有 {existing} 组）")
+
+
+if __name__ == "__main__":
+    main()
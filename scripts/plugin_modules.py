@@ -0,0 +1,23 @@
+"""
+供离线脚本导入卧底游戏插件中的模块。
+
+插件包的 __init__.py 会注册事件响应器并读取驱动器配置，脚本只需要其中的个别模块。
+这里在不执行 __init__.py 的情况下导入插件包的子模块: 只依赖标准库的模块（词库格式、事件格式等）
+无需初始化 NoneBot；依赖插件配置的模块（config 及引用它的模块）仍需先调用 nonebot.init() 读取配置。
+"""
+import sys
+import types
+import importlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "zako.plugins.spy_game"
+
+
+def import_module(name: str) -> types.ModuleType:
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [str(ROOT / "zako" / "plugins" / "spy_game")]
+        package.__package__ = PACKAGE
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
@@ -0,0 +1,34 @@
+"""
+卧底游戏分片部署的工作进程。
+
+由 SPY_GAME_SHARD_ROLE=front 的前端按 SPY_GAME_SHARD_TOTAL 自动启动并守护，一般不需要手动运行。
+工作进程不连接 OneBot 实现，通过 SPY_GAME_SHARD_SOCKET_PATH 与前端通信: 前端按群号把游戏分配给各工作进程，
+转发事件并代为调用接口；其余配置与前端相同，均读取 .env 文件。
+关闭 SPY_GAME_SHARD_SPAWN 时可自行启动（例如交给 systemd 守护）:
+    python scripts/shard_worker.py 0
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import nonebot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="卧底游戏分片工作进程")
+    parser.add_argument("index", type=int, help="工作进程编号，从 0 开始")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    # 工作进程不监听端口，事件全部来自前端
+    nonebot.init(driver="~none", spy_game_shard_role="worker", spy_game_shard_index=args.index)
+    nonebot.load_plugins("zako/plugins")
+    nonebot.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+卧底游戏的离线蒙特卡洛模拟。
+
+不连接机器人，直接驱动插件中真实的 Game 状态机（start -> start_vote/vote -> settle_vote -> is_finished/get_winner），
+由脚本化或随机的投票策略代替玩家，在进程池中并行模拟大量对局，边运行边输出汇总的胜负分布。
+用于在调整卧底和白板人数、人数上下限或平票规则前评估平衡性，也可以固定随机种子检查 Game 的行为是否变化。
+
+投票策略:
+    random  每名玩家随机投给一名其他存活玩家
+    skill   平民以 --accuracy 的概率投给卧底或白板，否则随机投票；卧底随机投给一名平民，白板随机投票
+    lowest  每名玩家投给座位号最小的其他存活玩家，结果完全确定
+
+平票规则:
+    discuss 平票时无人出局，回到讨论环节（当前规则）
+    random  平票时从票数最多的玩家中随机淘汰一名
+
+用法:
+    python scripts/simulate_games.py --games 1000000 --players 4-10 --policy skill --accuracy 0.4
+    python scripts/simulate_games.py --games 100000 --players 50-200 --players-per-spy 8 --players-per-blank 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import nonebot
+from plugin_modules import import_module
+
+Game = None
+Identity = None
+GameStatus = None
+
+
+class SimDeck:
+    """
+    只包含一组词对的牌堆，模拟中不关心具体词汇。
+    """
+
+    def get_pair_total(self):
+        return 1
+
+    def draw(self):
+        return "苹果", "梨"
+
+
+def init_worker(players_per_spy: int, players_per_blank: int):
+    global Game, Identity, GameStatus
+
+    os.chdir(ROOT)
+    # Game 读取插件配置中的人数上限与身份分配比例，比例通过配置传入
+    nonebot.init(log_level="WARNING",
+                 spy_game_players_per_spy=players_per_spy,
+                 spy_game_players_per_blank=players_per_blank)
+    Game = import_module("game").Game
+    Identity = import_module("identity").Identity
+    GameStatus = import_module("status").GameStatus
+
+
+def pick_other(rng: random.Random, voter, targets: list):
+    # 从候选中随机选择一名其他玩家，只在候选只有自己时返回 None，避免每票都复制一遍候选列表
+    if not targets or (len(targets) == 1 and targets[0] is voter):
+        return None
+    while (target := rng.choice(targets)) is voter:
+        pass
+    return target
+
+
+def vote_random(rng: random.Random, voter, alive: list, camps: dict, accuracy: float):
+    return pick_other(rng, voter, alive).get_seat()
+
+
+def vote_skill(rng: random.Random, voter, alive: list, camps: dict, accuracy: float):
+    target = None
+    if voter.get_identity() == Identity.SPY:
+        target = pick_other(rng, voter, camps["civilians"])
+    elif voter.get_identity() == Identity.CIVILIAN and rng.random() < accuracy:
+        target = pick_other(rng, voter, camps["spies"])
+    return (target or pick_other(rng, voter, alive)).get_seat()
+
+
+def vote_lowest(rng: random.Random, voter, alive: list, camps: dict, accuracy: float):
+    return alive[0].get_seat() if alive[0] is not voter else alive[1].get_seat()
+
+
+POLICIES = {
+    "random": vote_random,
+    "skill": vote_skill,
+    "lowest": vote_lowest
+}
+
+
+def new_stats() -> dict:
+    return {
+        "games": 0,
+        "civilian_wins": 0,
+        "spy_wins": 0,
+        "unfinished": 0,
+        "ties": 0,
+        "errors": 0,
+        "first_error": None,
+        # 人数 -> [对局数, 卧底胜利数]
+        "by_players": {},
+        # 轮数 -> 对局数
+        "rounds": {}
+    }
+
+
+def merge_stats(total: dict, stats: dict):
+    for key in ("games", "civilian_wins", "spy_wins", "unfinished", "ties", "errors"):
+        total[key] += stats[key]
+    if total["first_error"] is None:
+        total["first_error"] = stats["first_error"]
+    for player_total, (games, spy_wins) in stats["by_players"].items():
+        counts = total["by_players"].setdefault(player_total, [0, 0])
+        counts[0] += games
+        counts[1] += spy_wins
+    for rounds, games in stats["rounds"].items():
+        total["rounds"][rounds] = total["rounds"].get(rounds, 0) + games
+
+
+def play(rng: random.Random, options: dict, player_total: int, stats: dict):
+    """
+    模拟一局游戏，结果计入 stats。Game 的行为不符合预期时抛出 AssertionError。
+    """
+    game = Game.load({
+        "status": GameStatus.WAITING.value,
+        "host_user_id": 1,
+        "spy_players": 1,
+        "min_players": options["min_players"],
+        "max_players": options["max_players"],
+        "bans": [],
+        "players": [[user_id, 0, 0] for user_id in range(1, player_total + 1)],
+        "started": False,
+        "word": [None, None]
+    })
+    result = game.start(1, SimDeck())
+    assert result == 0, f"{player_total} 人开始游戏返回 {result}"
+    spies = sum(player.get_identity() == Identity.SPY for player in game.get_joined_players())
+    blanks = sum(player.get_identity() == Identity.BLANK for player in game.get_joined_players())
+    assert (spies, blanks) == (game.get_spy_players(), game.get_blank_players()), \
+        f"{player_total} 人分配了 {spies} 名卧底、{blanks} 名白板"
+    assert spies >= 1 and spies + blanks < player_total - spies - blanks, f"{player_total} 人开局时卧底阵营人数过多"
+
+    vote = POLICIES[options["policy"]]
+    rounds = 0
+    while not game.is_finished():
+        rounds += 1
+        if rounds > options["max_rounds"]:
+            stats["unfinished"] += 1
+            return
+
+        # 存活玩家按座位号排列，每轮按阵营分组一次
+        alive = list(game.get_alive_players())
+        camps = {"civilians": [], "spies": []}
+        for player in alive:
+            camps["civilians" if player.get_identity() == Identity.CIVILIAN else "spies"].append(player)
+        vote_round = game.start_vote(lambda _vote_round: None)
+        for voter in alive:
+            seat = None if rng.random() < options["abstain"] else vote(rng, voter, alive, camps, options["accuracy"])
+            result = game.vote(voter.get_user_id(), seat)
+            assert result == 0, f"座位 {voter.get_seat()} 投票给 {seat} 返回 {result}"
+        assert vote_round.is_closed(), "所有人投票后本轮投票没有结束"
+
+        leaders = list(vote_round.get_leaders())
+        tie = vote_round.is_tie()
+        out = game.settle_vote()
+        if tie:
+            stats["ties"] += 1
+            assert out is None, "平票时仍有玩家出局"
+            if options["tie"] == "random":
+                game.set_out(rng.choice(leaders))
+                if game.is_finished():
+                    game.set_game_status(GameStatus.FINISHED)
+        assert game.get_alive_total() == len(alive) - (out is not None or (tie and options["tie"] == "random")), \
+            "出局后存活人数不正确"
+
+    assert game.get_status() == GameStatus.FINISHED, f"游戏结束后状态为 {game.get_status()}"
+    winner = game.get_winner()
+    assert winner is not None, "游戏结束后没有胜利方"
+
+    spy_win = winner != "平民"
+    stats["spy_wins" if spy_win else "civilian_wins"] += 1
+    counts = stats["by_players"].setdefault(player_total, [0, 0])
+    counts[0] += 1
+    counts[1] += spy_win
+    stats["rounds"][rounds] = stats["rounds"].get(rounds, 0) + 1
+
+
+def simulate(seed: int, games: int, options: dict) -> dict:
+    rng = random.Random(seed)
+    # Game 内部使用 random 模块分配身份，同样需要固定种子
+    random.seed(seed)
+    stats = new_stats()
+    low, high = options["players"]
+    for _ in range(games):
+        stats["games"] += 1
+        try:
+            play(rng, options, rng.randint(low, high), stats)
+        except AssertionError as e:
+            stats["errors"] += 1
+            if stats["first_error"] is None:
+                stats["first_error"] = f"种子 {seed}: {e}"
+    return stats
+
+
+def parse_players(value: str) -> tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def summarize(stats: dict, elapsed: float) -> dict:
+    decided = stats["civilian_wins"] + stats["spy_wins"]
+    total_rounds = sum(rounds * games for rounds, games in stats["rounds"].items())
+    return {
+        "games": stats["games"],
+        "games_per_second": round(stats["games"] / elapsed) if elapsed else 0,
+        "spy_win_rate": round(stats["spy_wins"] / decided, 4) if decided else None,
+        "unfinished": stats["unfinished"],
+        "ties": stats["ties"],
+        "average_rounds": round(total_rounds / decided, 3) if decided else None,
+        "errors": stats["errors"],
+        "first_error": stats["first_error"],
+        "by_players": {
+            player_total: round(spy_wins / games, 4)
+            for player_total, (games, spy_wins) in sorted(stats["by_players"].items())
+        },
+        "rounds": dict(sorted(stats["rounds"].items()))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟卧底游戏对局")
+    parser.add_argument("--games", type=int, default=100_000, help="模拟的对局数量")
+    parser.add_argument("--players", type=parse_players, default=(4, 10), help="每局人数，如 6 或 4-10，范围内均匀抽取")
+    parser.add_argument("--players-per-spy", type=int, default=10, help="每多少名玩家分配一名卧底")
+    parser.add_argument("--players-per-blank", type=int, default=20, help="每多少名玩家分配一名白板，为 0 时没有白板")
+    parser.add_argument("--min-players", type=int, default=3, help="开始游戏的最少人数")
+    parser.add_argument("--policy", choices=POLICIES, default="skill", help="投票策略")
+    parser.add_argument("--accuracy", type=float, default=0.4, help="skill 策略下平民认出卧底的概率")
+    parser.add_argument("--abstain", type=float, default=0.0, help="每票弃权的概率")
+    parser.add_argument("--tie", choices=("discuss", "random"), default="discuss", help="平票规则")
+    parser.add_argument("--max-rounds", type=int, default=50, help="超过该轮数仍未结束的对局计为未结束")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="每个任务模拟的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，相同参数和种子的结果相同")
+    parser.add_argument("--output", help="将每次汇总以 JSON Lines 追加写入文件")
+    args = parser.parse_args()
+
+    options = {
+        "players": args.players,
+        "players_per_spy": args.players_per_spy,
+        "players_per_blank": args.players_per_blank,
+        "min_players": args.min_players,
+        "max_players": args.players[1],
+        "policy": args.policy,
+        "accuracy": args.accuracy,
+        "abstain": args.abstain,
+        "tie": args.tie,
+        "max_rounds": args.max_rounds
+    }
+    chunks = [min(args.chunk_size, args.games - start) for start in range(0, args.games, args.chunk_size)]
+    total = new_stats()
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                 initargs=(args.players_per_spy, args.players_per_blank)) as executor:
+            # 每个任务使用不同的种子，结果与进程数和完成顺序无关
+            futures = [executor.submit(simulate, args.seed * 1_000_003 + index, games, options)
+                       for index, games in enumerate(chunks)]
+            for future in as_completed(futures):
+                merge_stats(total, future.result())
+                summary = summarize(total, time.perf_counter() - start)
+                print(f"已模拟 {summary['games']}/{args.games} 局，卧底胜率 {summary['spy_win_rate']}，"
+                      f"平均 {summary['average_rounds']} 轮，{summary['games_per_second']} 局/秒", flush=True)
+                if output is not None:
+                    output.write(json.dumps(summary, ensure_ascii=False) + "\n")
+                    output.flush()
+    finally:
+        if output is not None:
+            output.close()
+
+    summary = summarize(total, time.perf_counter() - start)
+    print(json.dumps({"options": options, **summary}, ensure_ascii=False, indent=2))
+    if summary["errors"]:
+        sys.exit(f"{summary['errors']} 局不符合预期，第一个错误: {summary['first_error']}")
+
+
+if __name__ == "__main__":
+    main()
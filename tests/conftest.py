@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+import nonebot
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+# 插件模块在导入时读取配置，测试不连接 OneBot 实现
+nonebot.init(driver="~none")
@@ -0,0 +1,38 @@
+from plugin_modules import import_module
+
+decks = import_module("decks")
+
+
+class FakeLibrary:
+    def __init__(self, pair_total: int):
+        self.pair_total = pair_total
+
+    def get_pair_total(self, _category) -> int:
+        return self.pair_total
+
+    def get_pair(self, _category, index: int) -> int:
+        return index
+
+
+def test_draw_each_pair_once_per_round(monkeypatch):
+    library = FakeLibrary(1000)
+    monkeypatch.setattr(decks, "word_library", library)
+    deck = decks.WordDeck("默认")
+
+    first = [deck.draw() for _ in range(1000)]
+    assert sorted(first) == list(range(1000))
+    assert deck.get_remaining() == 0
+
+    second = [deck.draw() for _ in range(1000)]
+    assert sorted(second) == list(range(1000))
+
+
+def test_reshuffle_when_library_changes(monkeypatch):
+    library = FakeLibrary(10)
+    monkeypatch.setattr(decks, "word_library", library)
+    deck = decks.WordDeck("默认")
+
+    deck.draw()
+    library.pair_total = 3
+    drawn = [deck.draw() for _ in range(3)]
+    assert sorted(drawn) == [0, 1, 2]
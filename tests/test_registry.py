@@ -0,0 +1,32 @@
+import asyncio
+
+from plugin_modules import import_module
+
+registry_module = import_module("registry")
+game_module = import_module("game")
+
+
+def test_evict_in_game_mailbox():
+    async def main():
+        registry = registry_module.GameRegistry(10, 0.05, 0.05, 60)
+        evicted = []
+        registry.set_on_evict(lambda group_id, game: evicted.append(group_id))
+        idle = game_module.Game(1)
+        touched = game_module.Game(2)
+        registry.add(100, idle)
+        registry.add(101, touched)
+        await asyncio.sleep(0.1)
+
+        # 清理排在信箱中执行，排队期间又有操作的游戏不再清理
+        assert registry.sweep() == 2
+        assert registry.get(100) is idle
+        registry.touch(101)
+        await idle.call(lambda: None)
+        await touched.call(lambda: None)
+
+        assert evicted == [100]
+        assert registry.get(100) is None
+        assert registry.get(101) is touched
+        assert registry.get_evicted_total() == 1
+
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import asyncio
+
+from plugin_modules import import_module
+
+shard_worker = import_module("shard_worker")
+sharding = import_module("sharding")
+
+
+def test_release_games_before_reconnect(tmp_path):
+    path = str(tmp_path / "shards.sock")
+    # 前端一侧的游戏日志与工作进程中运行的游戏
+    journal = {101: "voting", 102: "discussing"}
+    games = {}
+    calls = []
+
+    async def on_release(alive):
+        calls.append(("release", alive))
+        for group_id in [group_id for group_id in games if sharding.get_owner(group_id, alive) != 0]:
+            journal[group_id] = games.pop(group_id)
+
+    async def on_adopt(alive):
+        calls.append(("adopt", alive))
+        for group_id in list(journal):
+            if sharding.get_owner(group_id, alive) == 0:
+                games[group_id] = journal.pop(group_id)
+
+    async def main():
+        connections = asyncio.Queue()
+
+        async def on_connect(reader, writer):
+            await connections.put((await sharding.read_frame(reader), writer))
+
+        server = await asyncio.start_unix_server(on_connect, path)
+        worker = shard_worker.ShardWorker(0, path)
+        worker.set_on_release(on_release)
+        worker.set_on_adopt(on_adopt)
+        worker.start()
+        try:
+            hello, writer = await asyncio.wait_for(connections.get(), 5)
+            assert hello == {"type": "hello", "index": 0}
+            sharding.write_frame(writer, {"type": "adopt", "alive": [0]})
+            await asyncio.sleep(0.1)
+            assert games == {101: "voting", 102: "discussing"}
+
+            # 游戏进行中连接断开，重连前交出全部游戏
+            writer.close()
+            hello, writer = await asyncio.wait_for(connections.get(), 5)
+            assert hello == {"type": "hello", "index": 0}
+            assert games == {}
+            assert journal == {101: "voting", 102: "discussing"}
+
+            # 重连后按新的分配重新接管
+            sharding.write_frame(writer, {"type": "adopt", "alive": [0]})
+            await asyncio.sleep(0.1)
+            assert games == {101: "voting", 102: "discussing"}
+            assert calls == [("adopt", (0,)), ("release", ()), ("adopt", (0,))]
+            writer.close()
+        finally:
+            await worker.stop()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+from plugin_modules import import_module
+
+timers = import_module("timers")
+
+
+def test_cancel_sibling_in_same_slot():
+    wheel = timers.TimerWheel(1, slot_total=8)
+    fired = []
+    second = None
+
+    def first():
+        fired.append("first")
+        second.cancel()
+
+    wheel.call_later(1, first)
+    second = wheel.call_later(1, lambda: fired.append("second"))
+    assert wheel.get_pending() == 2
+
+    wheel.advance()
+    assert fired == ["first"]
+    assert wheel.get_pending() == 0
+
+
+def test_fire_after_rounds():
+    wheel = timers.TimerWheel(1, slot_total=4)
+    fired = []
+    wheel.call_later(6, lambda: fired.append(6))
+    cancelled = wheel.call_later(2, lambda: fired.append(2))
+    cancelled.cancel()
+
+    for _ in range(5):
+        wheel.advance()
+    assert fired == []
+    assert wheel.get_pending() == 1
+
+    wheel.advance()
+    assert fired == [6]
+    assert wheel.get_pending() == 0
@@ -1,20 +1,53 @@
-from typing import Optional
-from nonebot import on_request
+from time import perf_counter
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+from nonebot import on_notice, on_request, get_driver, get_bot, get_bots
 from nonebot import CommandGroup
+from nonebot.log import logger
+from nonebot.rule import Rule
 from nonebot.typing import T_State
-from nonebot.permission import USER
 from nonebot.matcher import Matcher
 from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
+from nonebot.message import run_preprocessor, run_postprocessor, event_preprocessor
+from nonebot.exception import IgnoredException
+from nonebot.drivers import URL, Request, Response, ReverseDriver, HTTPServerSetup
 from nonebot.adapters.onebot.v11.bot import Bot
 from nonebot.internal.permission import Permission
 from nonebot.adapters.onebot.v11.message import Message, MessageSegment
-from nonebot.adapters.onebot.v11.event import GroupMessageEvent, PrivateMessageEvent, FriendRequestEvent
+from nonebot.adapters.onebot.v11.event import Event, MessageEvent, GroupMessageEvent, PrivateMessageEvent, \
+    FriendRequestEvent, FriendAddNoticeEvent, NoticeEvent
 
 from .game import Game
 from .status import GameStatus, PlayerStatus
 from .identity import Identity
-
-games: dict[int, Optional[Game]] = {}
+from .words import word_library
+from .decks import word_decks
+from .friends import friend_cache
+from .botpool import bot_pool
+from .fanout import PrivateFanout
+from .config import plugin_config
+from .scheduler import scheduler, Priority
+from .registry import registry
+from .vote import VoteRound
+from .journal import journal
+from .metrics import metrics
+from .timers import timer_wheel, TimerHandle
+from .routing import router
+from .roster import roster_announcer
+from .eventlog import event_log, Winner
+from .profiler import profiler
+from .sharding import get_owner
+from .shard_front import shard_front
+
+if plugin_config.spy_game_shard_role == "worker":
+    from .shard_worker import shard_worker
+
+driver = get_driver()
+private_fanout = PrivateFanout(plugin_config.spy_game_fanout_concurrency,
+                               plugin_config.spy_game_fanout_rate,
+                               plugin_config.spy_game_fanout_retries,
+                               plugin_config.spy_game_fanout_retry_delay)
 
 spy_cmd = CommandGroup("卧底游戏", priority=10)
 create_cmd = spy_cmd.command("创建")
@@ -22,15 +55,345 @@ delete_cmd = spy_cmd.command("删除")
 join_cmd = spy_cmd.command("加入")
 leave_cmd = spy_cmd.command("退出")
 ban_cmd = spy_cmd.command("踢人")
+max_players_cmd = spy_cmd.command("人数")
 change_global_word_cmd = spy_cmd.command("更改词库")
 start_cmd = spy_cmd.command("启动")
+profile_cmd = spy_cmd.command("性能分析", permission=SUPERUSER)
 notice_event = on_request()
+friend_notice = on_notice()
+# 重启后恢复、等待机器人连接后继续的游戏
+resuming_games: list[tuple[int, Game, list]] = []
+# 各群当前阶段的提醒与截止定时器
+phase_timers: dict[int, list[TimerHandle]] = {}
+# 各群尚未写入日志的投票
+pending_votes: dict[int, TimerHandle] = {}
+# 交给其他工作进程的群，移除游戏时不写入日志
+released_groups: set[int] = set()
+
+
+@driver.on_startup
+async def _():
+    word_library.start()
+    scheduler.start()
+    registry.start()
+    timer_wheel.start()
+
+    match plugin_config.spy_game_shard_role:
+        case "front":
+            # 前端不保存游戏，只转发事件
+            await shard_front.start()
+        case "worker":
+            # 工作进程在前端分配群之后再从日志中接管游戏
+            router.set_on_change(shard_worker.send_route)
+            shard_worker.set_on_release(_release_games)
+            shard_worker.set_on_adopt(_adopt_games)
+            journal.start()
+            shard_worker.start()
+        case _:
+            # 恢复重启前进行中的游戏
+            await _restore_games()
+            logger.info(f"已恢复 {registry.get_live_total()} 局游戏")
+            journal.start()
+    event_log.start()
+    if plugin_config.spy_game_profile_on_start:
+        profiler.start(plugin_config.spy_game_profile_duration)
+
+
+@driver.on_shutdown
+async def _():
+    await word_library.stop()
+    await scheduler.stop()
+    await registry.stop()
+    await timer_wheel.stop()
+    await journal.stop()
+    await event_log.stop()
+    await profiler.close()
+    match plugin_config.spy_game_shard_role:
+        case "front":
+            await shard_front.stop()
+        case "worker":
+            await shard_worker.stop()
+
+
+@driver.on_bot_connect
+async def _(bot: Bot):
+    if plugin_config.spy_game_shard_role == "front":
+        shard_front.on_bot_connect(bot)
+    _resume_games({bot.self_id: bot})
+    bot_pool.add(bot)
+    # 预先加载好友列表，失败时由好友缓存在首次使用时重新加载
+    try:
+        await friend_cache.refresh(bot)
+    except Exception as e:
+        logger.warning(f"加载 {bot.self_id} 的好友列表失败: {e}")
+
+
+@driver.on_bot_disconnect
+async def _(bot: Bot):
+    if plugin_config.spy_game_shard_role == "front":
+        shard_front.on_bot_disconnect(bot)
+    bot_pool.remove(bot)
+    friend_cache.forget(bot)
+
+
+# 从日志中恢复游戏，指定 alive 时只恢复分配给当前工作进程的游戏，已在运行的游戏不受影响
+async def _restore_games(alive: tuple[int, ...] = ()) -> int:
+    restored = 0
+    for group_id, data in (await journal.restore()).items():
+        if alive and get_owner(group_id, alive) != shard_worker.get_index():
+            continue
+        try:
+            game = Game.load(data)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.warning(f"群 {group_id} 的游戏恢复失败: {e}")
+            continue
+        if game.get_status() == GameStatus.FINISHED or registry.add(group_id, game) != 0:
+            continue
+        _track(group_id, game)
+        _route(group_id, game)
+        if game.get_status() in (GameStatus.DISCUSSING, GameStatus.VOTING):
+            resuming_games.append((group_id, game, data["ballots"]))
+        restored += 1
+    return restored
+
+
+# 分片重新分配后接管分配给当前工作进程的游戏，已连接机器人时立即继续
+async def _adopt_games(alive: tuple[int, ...]):
+    restored = await _restore_games(alive)
+    if restored:
+        logger.info(f"已接管 {restored} 局游戏")
+    _resume_games(get_bots())
+
+
+# 通过创建游戏的账号继续等待中的游戏，该账号尚未连接的游戏继续等待；旧日志中没有记录账号的游戏由任意账号继续
+def _resume_games(bots: dict[str, Bot]):
+    waiting = []
+    for group_id, game, ballots in resuming_games:
+        self_id = game.get_self_id()
+        bot = bots.get(self_id) if self_id is not None else next(iter(bots.values()), None)
+        if bot is None:
+            waiting.append((group_id, game, ballots))
+            continue
+        game.post(_resume_game, bot, group_id, game, ballots)
+    resuming_games[:] = waiting
+
+
+# 分片重新分配前交出不再属于当前工作进程的游戏，等待日志写入后其他工作进程才能接管；alive 为空时交出全部游戏
+async def _release_games(alive: tuple[int, ...]):
+    index = shard_worker.get_index()
+    released = [(group_id, game) for group_id, game in registry.get_items() if get_owner(group_id, alive) != index]
+    for group_id, game in released:
+        await game.call(_release_game, group_id, game)
+    await journal.flush()
+    if released:
+        logger.info(f"已交出 {len(released)} 局游戏")
+
+
+def _release_game(group_id: int, game: Game):
+    if registry.get(group_id) is not game:
+        return
+    # 合并中的投票随完整状态一起写入
+    journal.record(group_id, "release", game.dump())
+    released_groups.add(group_id)
+    registry.remove(group_id, game)
+
+
+# 记录各指令的处理耗时与异常
+matcher_names = {
+    create_cmd: "create",
+    delete_cmd: "delete",
+    join_cmd: "join",
+    leave_cmd: "leave",
+    ban_cmd: "ban",
+    max_players_cmd: "max_players",
+    change_global_word_cmd: "change_global_word",
+    start_cmd: "start",
+    profile_cmd: "profile",
+    notice_event: "friend_request",
+    friend_notice: "friend_notice"
+}
+matcher_started_at: WeakKeyDictionary[Matcher, float] = WeakKeyDictionary()
+api_started_at: dict[int, float] = {}
+
+
+def _matcher_name(matcher: Matcher) -> str:
+    for matcher_type, name in matcher_names.items():
+        if isinstance(matcher, matcher_type):
+            # 会话中的后续消息由临时事件响应器处理
+            return f"{name}.receive" if matcher.temp else name
+    return "unknown"
+
+
+@run_preprocessor
+async def _(matcher: Matcher, event: Event):
+    # 前端只处理好友请求，游戏由工作进程处理
+    if plugin_config.spy_game_shard_role == "front" and matcher.module_name == __name__ \
+            and not isinstance(matcher, notice_event):
+        raise IgnoredException("游戏由工作进程处理")
+    if matcher.module_name == __name__:
+        matcher_started_at[matcher] = perf_counter()
+        # 性能分析期间按群和游戏阶段标记处理该事件的任务
+        if profiler.is_active() and isinstance(event, GroupMessageEvent):
+            game = registry.get(event.group_id)
+            phase = game.get_status().name if game is not None else "NONE"
+            profiler.tag(matcher, event.group_id, phase)
+            if game is not None:
+                profiler.tag(game.get_mailbox(), event.group_id, phase)
+
+
+@run_postprocessor
+async def _(matcher: Matcher, exception: Optional[Exception]):
+    started_at = matcher_started_at.pop(matcher, None)
+    if started_at is None:
+        return
+    name = _matcher_name(matcher)
+    metrics.observe("spy_game_command_duration_seconds", perf_counter() - started_at, command=name)
+    if profiler.is_active():
+        profiler.record(name, perf_counter() - started_at, matcher)
+    if exception is not None:
+        metrics.inc("spy_game_command_errors_total", command=name)
+
+
+@Bot.on_calling_api
+async def _(bot: Bot, api: str, data: dict[str, Any]):
+    api_started_at[id(data)] = perf_counter()
+
+
+@Bot.on_called_api
+async def _(bot: Bot, exception: Optional[Exception], api: str, data: dict[str, Any], result: Any):
+    started_at = api_started_at.pop(id(data), None)
+    if started_at is not None:
+        metrics.observe("spy_game_api_duration_seconds", perf_counter() - started_at, api=api)
+        if profiler.is_active():
+            profiler.record(f"api:{api}", perf_counter() - started_at, group_id=data.get("group_id"))
+    if exception is not None:
+        metrics.inc("spy_game_api_errors_total", api=api)
+
+
+def _collect_games():
+    totals = {status: 0 for status in GameStatus}
+    for game in registry.get_games():
+        totals[game.get_status()] += 1
+    return [({"status": status.name}, total) for status, total in totals.items()]
+
+
+def _collect_scheduler():
+    scheduler_metrics = scheduler.get_metrics()
+    return [({"result": result}, scheduler_metrics[result]) for result in ("enqueued", "sent", "failed", "dropped")]
+
+
+metrics.add_gauge("spy_game_games", _collect_games)
+metrics.add_gauge("spy_game_games_lifetime", lambda: [
+    ({"event": "created"}, registry.get_created_total()),
+    ({"event": "removed"}, registry.get_removed_total()),
+    ({"event": "evicted"}, registry.get_evicted_total())
+])
+metrics.add_gauge("spy_game_send_queue_depth", lambda: [({}, scheduler.get_depth())])
+metrics.add_gauge("spy_game_send_messages", _collect_scheduler)
+metrics.add_gauge("spy_game_fanout_failures", lambda: [({}, private_fanout.get_failures())])
+metrics.add_gauge("spy_game_bot_private_load",
+                  lambda: [({"self_id": self_id}, load) for self_id, load in bot_pool.get_load().items()])
+metrics.add_gauge("spy_game_timers_pending", lambda: [({}, timer_wheel.get_pending())])
+metrics.add_gauge("spy_game_routed_users", lambda: [({}, router.get_total())])
+# 只列出有指令排队的游戏，便于找出繁忙的群
+metrics.add_gauge("spy_game_queue_depth", lambda: [
+    ({"group_id": group_id}, game.get_queue_depth()) for group_id, game in registry.get_items() if game.get_queue_depth()
+])
+
+
+# 通过驱动器提供 Prometheus 格式的指标
+async def _metrics_endpoint(request: Request) -> Response:
+    return Response(200, headers={"Content-Type": "text/plain; version=0.0.4"}, content=metrics.render())
+
+
+if isinstance(driver, ReverseDriver) and plugin_config.spy_game_metrics_path:
+    driver.setup_http_server(HTTPServerSetup(URL(plugin_config.spy_game_metrics_path),
+                                             "GET",
+                                             "spy_game_metrics",
+                                             _metrics_endpoint))
+
+
+# 清理长时间无人操作的游戏时通知群聊
+def _on_evict(group_id: int, game: Game):
+    try:
+        bot = get_bot(game.get_self_id())
+    except (KeyError, ValueError):
+        return
+    scheduler.send_group_msg(bot, group_id, "游戏长时间无人操作，已自动结束！", Priority.CRITICAL)
+
+
+# 游戏状态变化时写入日志
+def _track(group_id: int, game: Game):
+    def record(this_game: Game, kind: str, _user_id):
+        # 投票只改变选票，合并一段时间内的投票后记录一次，人数较多时不必每张选票都序列化整局游戏
+        if kind == "vote":
+            if group_id not in pending_votes:
+                pending_votes[group_id] = timer_wheel.call_later(plugin_config.spy_game_journal_flush_interval,
+                                                                 lambda: record(this_game, "votes", None))
+            return
+
+        handle = pending_votes.pop(group_id, None)
+        if handle is not None:
+            handle.cancel()
+        # 游戏结束后不再记录，避免已移除的游戏被重新恢复
+        if registry.get(group_id) is this_game:
+            journal.record(group_id, kind, this_game.dump())
+
+    game.add_listener(record)
+
+
+# 玩家加入、退出或出局时更新私聊路由
+def _route(group_id: int, game: Game):
+    def update(this_game: Game, kind: str, user_id):
+        match kind:
+            case "join":
+                router.bind(user_id, group_id, this_game)
+            case "leave" | "out":
+                router.unbind(user_id, this_game)
+
+    for player in game.get_joined_players():
+        if player.get_status() == PlayerStatus.GAMING:
+            router.bind(player.get_user_id(), group_id, game)
+    game.add_listener(update)
+
+
+# 游戏移除时取消定时器并写入日志
+def _on_remove(group_id: int, game: Game):
+    _set_phase_timers(group_id)
+    handle = pending_votes.pop(group_id, None)
+    if handle is not None:
+        handle.cancel()
+    roster_announcer.discard(group_id)
+    router.unbind_game(game)
+    game.close_session()
+    if group_id in released_groups:
+        released_groups.discard(group_id)
+        return
+    journal.record(group_id, "remove", None)
+
+
+registry.set_on_evict(_on_evict)
+registry.set_on_remove(_on_remove)
 
 
 # 通过好友请求
 @notice_event.handle()
 async def _(bot: Bot, event: FriendRequestEvent):
     await bot.set_friend_add_request(flag=event.flag, approve=True)
+    friend_cache.add(bot, event.user_id)
+
+
+@friend_notice.handle()
+async def _(bot: Bot, event: FriendAddNoticeEvent):
+    friend_cache.add(bot, event.user_id)
+
+
+# OneBot V11 标准中没有删除好友的通知，兼容上报 friend_delete 的实现，其余情况依靠定时刷新
+@friend_notice.handle()
+async def _(bot: Bot, event: NoticeEvent):
+    user_id = getattr(event, "user_id", None)
+    if event.notice_type == "friend_delete" and user_id is not None:
+        friend_cache.remove(bot, user_id)
 
 
 @create_cmd.handle()
@@ -38,20 +401,31 @@ async def _(bot: Bot, event: GroupMessageEvent):
     user_id = event.user_id
     group_id = event.group_id
 
-    if games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏已经存在！")
+    if registry.get(group_id):
+        scheduler.send_group_msg(bot, group_id, "游戏已经存在！")
         await create_cmd.finish()
 
     new_game = Game(user_id)
+    new_game.set_self_id(bot.self_id)
     message = "未知错误！"
-    match await new_game.add_player(user_id):
+    match metrics.result("add_player", await new_game.add_player(user_id)):
         case 0:
-            games[group_id] = new_game
-            message = "游戏创建成功！请输入 /卧底游戏 加入 加入游戏！"
+            match registry.add(group_id, new_game):
+                case 0:
+                    _track(group_id, new_game)
+                    _route(group_id, new_game)
+                    journal.record(group_id, "create", new_game.dump())
+                    message = "游戏创建成功！请输入 /卧底游戏 加入 加入游戏！"
+                case 1:
+                    message = "游戏已经存在！"
+                case 2:
+                    message = "当前进行中的游戏过多，请稍后再试！"
         case 4:
             message = "创建失败！请先添加机器人好友！"
+        case 6:
+            message = "创建失败！您正在其他群的游戏中！"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @delete_cmd.handle()
@@ -59,17 +433,17 @@ async def _(bot: Bot, event: GroupMessageEvent):
     user_id = event.user_id
     group_id = event.group_id
 
-    if not games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏不存在！")
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！")
         await delete_cmd.finish()
 
-    this_game = games[group_id]
+    registry.touch(group_id)
     if this_game.get_host_user_id() != user_id and event.sender.role == "member":
-        await bot.send_group_msg(group_id=group_id, message="非房主/管理员无法删除游戏！")
+        scheduler.send_group_msg(bot, group_id, "非房主/管理员无法删除游戏！")
     else:
-        del this_game
-        games[group_id] = None
-        await bot.send_group_msg(group_id=group_id, message="删除游戏成功！")
+        await this_game.call(registry.remove, group_id, this_game)
+        scheduler.send_group_msg(bot, group_id, "删除游戏成功！")
 
 
 @join_cmd.handle()
@@ -77,19 +451,18 @@ async def _(bot: Bot, event: GroupMessageEvent):
     user_id = event.user_id
     group_id = event.group_id
 
-    if not games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏不存在！请先创建游戏！")
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！请先创建游戏！")
         await join_cmd.finish()
 
-    this_game = games[group_id]
+    registry.touch(group_id)
     message = "未知错误！"
-    match await this_game.add_player(user_id):
+    match metrics.result("add_player", await this_game.call(this_game.add_player, user_id)):
         case 0:
-            message = "您已加入游戏！\n" \
-                      f"人数: {this_game.get_player_total()}/{this_game.get_max_players()}\n" \
-                      f"已加入玩家QQ号:\n"
-            players_str = [f"-{player.get_user_id()}" for player in this_game.get_joined_players()]
-            message += "\n".join(players_str)
+            # 加入成功后合并公布名单，失败时立即回复
+            roster_announcer.add(bot, group_id, this_game, user_id, True)
+            await join_cmd.finish()
         case 1:
             message = "加入失败！游戏已经开始！"
         case 2:
@@ -100,8 +473,10 @@ async def _(bot: Bot, event: GroupMessageEvent):
             message = "加入失败！请先添加机器人好友！"
         case 5:
             message = "加入失败！您已经在房间中了！"
+        case 6:
+            message = "加入失败！您正在其他群的游戏中！"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @leave_cmd.handle()
@@ -109,19 +484,17 @@ async def _(bot: Bot, event: GroupMessageEvent):
     user_id = event.user_id
     group_id = event.group_id
 
-    if not games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏不存在！")
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！")
         await leave_cmd.finish()
 
-    this_game = games[group_id]
+    registry.touch(group_id)
     message = "未知错误！"
-    match this_game.delete_player(user_id):
+    match metrics.result("delete_player", await this_game.call(this_game.delete_player, user_id)):
         case 0:
-            message = "您已退出游戏！\n" \
-                      f"人数: {this_game.get_player_total()}/{this_game.get_max_players()}\n" \
-                      f"已加入玩家QQ号:\n"
-            players_str = [f"-{player.get_user_id()}" for player in this_game.get_joined_players()]
-            message += "\n".join(players_str)
+            roster_announcer.add(bot, group_id, this_game, user_id, False)
+            await leave_cmd.finish()
         case 1:
             message = "无法退出！游戏已经开始！"
         case 2:
@@ -129,7 +502,7 @@ async def _(bot: Bot, event: GroupMessageEvent):
         case 3:
             message = "无法退出！您未加入游戏！"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @change_global_word_cmd.handle()
@@ -138,12 +511,12 @@ async def _(bot: Bot, event: GroupMessageEvent):
 
     # 判断是否为管理员
     if event.sender.role == "member":
-        await bot.send_group_msg(group_id=group_id, message="您不是管理员，无法更改词库！")
+        scheduler.send_group_msg(bot, group_id, "您不是管理员，无法更改词库！")
         await change_global_word_cmd.finish()
 
-    words = Game.get_words().keys()
-    message = "请输入要更改的词库\n" + "\n".join(words)
-    await bot.send_group_msg(group_id=group_id, message=message)
+    words = Game.get_words()
+    message = f"本群当前词库: {word_decks.get(group_id).get_category()}\n请输入要更改的词库\n" + "\n".join(words)
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @change_global_word_cmd.receive()
@@ -152,13 +525,13 @@ async def _(bot: Bot, event: GroupMessageEvent):
     new_words = event.raw_message
 
     message = "未知错误!"
-    match Game.change_global_word(new_words):
+    match word_decks.get(group_id).set_category(new_words):
         case 1:
             message = "不存在该词库！"
         case 0:
-            message = f"已更改词库为{new_words}"
+            message = f"已更改本群词库为{new_words}"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @ban_cmd.handle()
@@ -166,14 +539,15 @@ async def _(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
     user_id = event.user_id
     group_id = event.group_id
 
-    if not games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏不存在！")
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！")
         await ban_cmd.finish()
 
-    this_game = games[group_id]
+    registry.touch(group_id)
     ban_user_id = args[0].data.get("qq", None)
     message = "未知错误！"
-    match this_game.ban_player(user_id, ban_user_id):
+    match metrics.result("ban_player", await this_game.call(this_game.ban_player, user_id, ban_user_id)):
         case 0 | 3:
             message = f"已将{ban_user_id}加入黑名单！"
         case 1:
@@ -185,7 +559,69 @@ async def _(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
         case 5:
             message = f"参数不合法，参数为@用户"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
+
+
+@max_players_cmd.handle()
+async def _(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
+    user_id = event.user_id
+    group_id = event.group_id
+
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！")
+        await max_players_cmd.finish()
+
+    registry.touch(group_id)
+    max_players = args.extract_plain_text().strip()
+    if not max_players.isdigit():
+        scheduler.send_group_msg(bot, group_id, "参数不合法，参数为人数上限！")
+        await max_players_cmd.finish()
+
+    max_players = int(max_players)
+    message = "未知错误！"
+    match metrics.result("set_max_players", await this_game.call(this_game.set_max_players, user_id, max_players)):
+        case 0:
+            # 名单中包含新的人数上限
+            roster_announcer.flush(bot, group_id)
+            message = f"已将人数上限设置为{max_players}人！"
+        case 1:
+            message = "游戏已经开始，无法更改人数上限！"
+        case 2:
+            message = "您不是房主，不能使用该指令！"
+        case 3:
+            message = "人数上限不能少于3人！"
+        case 4:
+            message = f"人数上限不能超过{plugin_config.spy_game_max_players_limit}人！"
+        case 5:
+            message = "已加入的人数超过了新的人数上限！"
+
+    scheduler.send_group_msg(bot, group_id, message)
+
+
+@profile_cmd.handle()
+async def _(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
+    group_id = event.group_id
+
+    duration = args.extract_plain_text().strip()
+    if duration and not duration.replace(".", "", 1).isdigit():
+        scheduler.send_group_msg(bot, group_id, "参数不合法，参数为分析时长（秒）！")
+        await profile_cmd.finish()
+    duration = float(duration) if duration else plugin_config.spy_game_profile_duration
+
+    match profiler.start(duration):
+        case 0:
+            scheduler.send_group_msg(bot, group_id, f"性能分析已开启，{duration:g}秒后写入结果！")
+        case 1:
+            scheduler.send_group_msg(bot, group_id, "性能分析正在进行中！")
+            await profile_cmd.finish()
+        case 2:
+            scheduler.send_group_msg(bot, group_id, "当前平台不支持性能分析！")
+            await profile_cmd.finish()
+
+    paths = await profiler.wait()
+    message = "性能分析结束，结果已写入:\n" + "\n".join(paths) if paths else "性能分析结果写入失败！"
+    scheduler.send_group_msg(bot, group_id, message)
 
 
 @start_cmd.handle()
@@ -193,25 +629,42 @@ async def _(bot: Bot, event: GroupMessageEvent, state: T_State):
     user_id = event.user_id
     group_id = event.group_id
 
-    if not games.get(group_id):
-        await bot.send_group_msg(group_id=group_id, message="游戏不存在！")
+    this_game = registry.get(group_id)
+    if not this_game:
+        scheduler.send_group_msg(bot, group_id, "游戏不存在！")
         await start_cmd.finish()
 
-    this_game = games[group_id]
+    registry.touch(group_id)
     message = "未知错误，开始失败！"
-    match this_game.start(user_id):
+    match metrics.result("start", await this_game.call(this_game.start, user_id, word_decks.get(group_id))):
         case 0:
             message = "游戏开始！词汇已经发放，接下来是自由讨论时间。房主回复: “结束讨论”进行投票！"
-            await bot.send_group_msg(group_id=group_id, message=message)
+            scheduler.send_group_msg(bot, group_id, message, Priority.CRITICAL)
+            if this_game.get_spy_players() > 1 or this_game.get_blank_players():
+                message = f"本局共有{this_game.get_spy_players()}名卧底，{this_game.get_blank_players()}名白板！"
+                scheduler.send_group_msg(bot, group_id, message, Priority.CRITICAL)
             civilian_word = this_game.get_word()["平民"]
             spy_word = this_game.get_word()["卧底"]
+            messages = {}
             for player in this_game.get_joined_players():
-                if player.get_identity() == Identity.SPY:
-                    await bot.send_private_msg(user_id=player.get_user_id(), message=f"你的词汇: {spy_word}")
-                else:
-                    await bot.send_private_msg(user_id=player.get_user_id(), message=f"你的词汇: {civilian_word}")
+                match player.get_identity():
+                    case Identity.SPY:
+                        messages[player.get_user_id()] = f"你的词汇: {spy_word}"
+                    case Identity.BLANK:
+                        messages[player.get_user_id()] = "你是白板，没有词汇！请根据其他玩家的发言隐藏自己！"
+                    case _:
+                        messages[player.get_user_id()] = f"你的词汇: {civilian_word}"
+
+            # 并发发放词汇，并公布未能收到词汇的玩家
+            failed = await private_fanout.send(group_id, messages)
+            if failed:
+                _send_chunked(bot, group_id, "以下玩家未能收到词汇，请检查是否已添加机器人好友:\n",
+                              [MessageSegment.at(failed_user_id) for failed_user_id in failed])
             state["this_game"] = this_game
             state["group_id"] = group_id
+            roster_announcer.discard(group_id)
+            event_log.start_game(group_id, this_game)
+            _schedule_discussion(bot, group_id, this_game)
 
             await start_cmd.skip()
         case 1:
@@ -220,193 +673,368 @@ async def _(bot: Bot, event: GroupMessageEvent, state: T_State):
             message = "游戏已经开始！"
         case 3:
             message = "人数不足3人，无法开始！"
+        case 4:
+            message = "当前词库为空，请更改词库后再开始！"
 
-    await bot.send_group_msg(group_id=group_id, message=message)
+    scheduler.send_group_msg(bot, group_id, message)
     await start_cmd.finish()
 
 
 @start_cmd.permission_updater
-async def _(matcher: Matcher, state: T_State) -> Permission:
-    group_id = state["group_id"]
-    this_game: Game = state["this_game"]
-    ids = []
-
-    for user in this_game.get_alive_players():
-        user_id = user.get_user_id()
-        ids.extend([f"group_{group_id}_{user_id}", f"{user_id}"])
-
-    host_user_id = this_game.get_host_user_id()
-    if this_game.get_player(host_user_id).get_status() == PlayerStatus.OUT:
-        ids.append(f"group_{group_id}_{host_user_id}")
-
-    return USER(*ids, perm=matcher.permission)
+async def _update_game_permission(matcher: Matcher, state: T_State) -> Permission:
+    start = perf_counter()
+    permission = state["this_game"].get_permission(state["group_id"])
+    metrics.observe("spy_game_permission_update_seconds", perf_counter() - start)
+    return permission
 
 
 @start_cmd.receive()
-async def _(bot: Bot,
-            event: GroupMessageEvent | PrivateMessageEvent,
-            state: T_State):
+async def _on_game_message(bot: Bot, event: GroupMessageEvent, state: T_State):
     user_id = event.user_id
     group_id = state["group_id"]
     this_game: Game = state["this_game"]
 
-    # 如果游戏被中途删除，则结束游戏
-    if not this_game:
+    # 如果游戏被中途删除或清理，则结束会话
+    if registry.get(group_id) is not this_game:
         await start_cmd.finish()
+    registry.touch(group_id)
+    metrics.inc("spy_game_messages_total", phase=this_game.get_status().name)
 
     # 游戏中删除游戏
     if (this_game.get_host_user_id() == user_id or event.sender.role != "member") and event.raw_message == "结束游戏":
-        games[group_id] = None
-        await bot.send_group_msg(group_id=group_id, message="游戏已结束！")
+        await this_game.call(registry.remove, group_id, this_game)
+        scheduler.send_group_msg(bot, group_id, "游戏已结束！", Priority.CRITICAL)
         await start_cmd.finish()
 
-    # 群事件响应
-    if isinstance(event, GroupMessageEvent):
-        match this_game.get_status():
-            case GameStatus.VOTING:
+    match this_game.get_status():
+        case GameStatus.VOTING:
+            await start_cmd.reject()
+        case GameStatus.DISCUSSING:
+            raw_message = event.raw_message
+
+            # 是房主并且发送结束讨论，进入投票环节
+            if this_game.get_host_user_id() == user_id and raw_message == "结束讨论":
+                await this_game.call(_start_vote, bot, group_id, this_game)
                 await start_cmd.reject()
-            case GameStatus.DISCUSSING:
-                raw_message = event.raw_message
-
-                # 是房主并且发送结束讨论，进入投票环节
-                if this_game.get_host_user_id() == user_id and raw_message == "结束讨论":
-                    vote = {
-                        "alive_players_total": len(this_game.get_alive_players()),
-                        "vote_count": 0,
-                        "users": {},
-                        "votes": {}
-                    }
-                    state["vote"] = vote
-                    message = "投票环节开始！请私聊投票对应编号！\n"
-                    for index, player in enumerate(this_game.get_joined_players()):
-                        if player.get_status() == PlayerStatus.GAMING:
-                            message += f"-{index}->" + MessageSegment.at(player.get_user_id()) + "\n"
-                            vote["users"][player.get_user_id()] = False
-                            vote["votes"][index] = 0
-
-                    this_game.set_game_status(GameStatus.VOTING)
-                    await bot.send_group_msg(group_id=group_id, message=message)
-                    await start_cmd.reject()
-
-                # 判断是否是已经被淘汰的房主
-                player = this_game.get_player(user_id)
-                if player.get_status() == PlayerStatus.OUT:
-                    await start_cmd.reject()
-
-                word = this_game.get_word()[
-                    "卧底" if player.get_identity() == Identity.SPY else "平民"]
-
-                # 如果句中包含自己的词汇，游戏直接结束
-                if any(char in raw_message for char in word):
-                    await bot.send_group_msg(group_id=group_id, message=MessageSegment.at(user_id) + "触发词汇！")
-                    state["触发词汇"] = {"user_id": user_id, "identity": player.get_identity()}
-                    this_game.set_game_status(GameStatus.FINISHED)
-                    await start_cmd.skip()
 
+            # 判断是否是已经被淘汰的房主
+            player = this_game.get_player(user_id)
+            if player.get_status() == PlayerStatus.OUT:
                 await start_cmd.reject()
-            case GameStatus.FINISHED:
-                await start_cmd.skip()
+
+            # 如果句中包含自己的词汇，游戏直接结束
+            if this_game.is_triggered(player, raw_message):
+                match await this_game.call(_trigger_word, bot, group_id, this_game, user_id):
+                    case 0:
+                        state["触发词汇"] = {"user_id": user_id, "identity": player.get_identity()}
+                        await start_cmd.skip()
+                    case 1:
+                        await start_cmd.finish()
+
+            await start_cmd.reject()
+        case GameStatus.FINISHED:
+            await start_cmd.skip()
+
+
+# 玩家说出自己的词汇时结束游戏，在游戏的信箱中执行，排队期间游戏可能已被删除或进入投票
+def _trigger_word(bot: Bot, group_id: int, game: Game, user_id: int):
+    # 如果游戏已被删除或清理，返回1
+    if registry.get(group_id) is not game:
+        return 1
+
+    # 如果已经不在讨论环节，返回2
+    if game.get_status() != GameStatus.DISCUSSING:
+        return 2
+
+    # 成功返回0
+    scheduler.send_group_msg(bot, group_id, MessageSegment.at(user_id) + "触发词汇！", Priority.CRITICAL)
+    event_log.trigger(group_id, game, user_id)
+    game.set_game_status(GameStatus.FINISHED)
+    return 0
+
+
+# 私聊消息按路由索引直接交给玩家所在的游戏处理，不再进入事件响应器
+@event_preprocessor
+async def _(bot: Bot, event: Event):
+    # 前端将群消息、玩家的私聊和好友通知转发给工作进程
+    if plugin_config.spy_game_shard_role == "front":
+        if isinstance(event, (MessageEvent, NoticeEvent)) and shard_front.forward(bot, event) \
+                and isinstance(event, PrivateMessageEvent):
+            raise IgnoredException("私聊投票已转发")
+        if isinstance(event, PrivateMessageEvent) and plugin_config.spy_game_drop_private_chatter:
+            raise IgnoredException("与游戏无关的私聊消息")
+        return
+
+    if not isinstance(event, PrivateMessageEvent):
+        return
+
+    route = router.get(event.user_id)
+    if route is not None:
+        group_id, this_game = route
+        if registry.get(group_id) is this_game and this_game.get_status() == GameStatus.VOTING:
+            start = perf_counter()
+            registry.touch(group_id)
+            metrics.inc("spy_game_messages_total", phase=GameStatus.VOTING.name)
+            if profiler.is_active():
+                profiler.tag(this_game.get_mailbox(), group_id, GameStatus.VOTING.name)
+            await this_game.call(_on_private_vote, bot, event, group_id, this_game)
+            metrics.observe("spy_game_command_duration_seconds", perf_counter() - start, command="vote")
+            if profiler.is_active():
+                profiler.record("vote", perf_counter() - start, this_game.get_mailbox())
+            raise IgnoredException("私聊投票已处理")
+
+    # 与游戏无关的私聊消息直接丢弃
+    if plugin_config.spy_game_drop_private_chatter:
+        raise IgnoredException("与游戏无关的私聊消息")
+
+
+def _on_private_vote(bot: Bot, event: PrivateMessageEvent, group_id: int, this_game: Game):
+    user_id = event.user_id
+
+    # 判断投票是否合法
+    raw_message = event.raw_message.strip()
+    if raw_message == "弃权":
+        seat = None
+    elif raw_message.isdigit():
+        seat = int(raw_message)
     else:
-        # 私聊事件响应
-        match this_game.get_status():
-            case GameStatus.VOTING:
-                # 判断投票是否合法
-                raw_message = event.raw_message
-                if not raw_message.isdigit():
-                    await bot.send_private_msg(user_id=user_id, message="投票数据不合法，请重新投票！")
-                    await start_cmd.reject()
-
-                vote = state["vote"]
-
-                # 判断是否投过票
-                if vote["users"][user_id]:
-                    await bot.send_private_msg(user_id=user_id, message="您已经投过票了！")
-                    await start_cmd.reject()
-
-                # 判断投票的目标是否存在
-                vote_index = int(raw_message)
-                if vote_index not in vote["votes"].keys():
-                    await bot.send_private_msg(user_id=user_id, message="请投票给存活的玩家！")
-                    await start_cmd.reject()
-
-                # 判断是否给自己投票
-                if user_id == this_game.get_player_with_index(vote_index).get_user_id():
-                    await bot.send_private_msg(user_id=user_id, message="不能给自己投票！")
-                    await start_cmd.reject()
-
-                # 投票成功
-                vote["vote_count"] += 1
-                vote["users"][user_id] = True
-                vote["votes"][vote_index] += 1
-                await bot.send_private_msg(user_id=user_id, message="投票成功！")
-
-                # 判断是否所有人都已经投票
-                if vote["vote_count"] != vote["alive_players_total"]:
-                    await start_cmd.reject()
-
-                # 获取将要出局玩家在已加入玩家中的索引
-                votes = vote["votes"].items()
-                max_vote = max(votes, key=lambda x: x[1])
-                same_players = [v for v in votes if v[1] == max_vote[1]]
-
-                group_id = state["group_id"]
-
-                # 判断是否平票
-                if len(same_players) > 1:
-                    this_game.set_game_status(GameStatus.DISCUSSING)
-                    await bot.send_group_msg(group_id=group_id,
-                                             message="出现平票！本轮没有用户出局！进入自由讨论时间！房主回复: “结束讨论”进行投票！")
-                    await start_cmd.reject()
-
-                index = max_vote[0]
-                this_game.set_out(index)
-                user_id = this_game.get_player_with_index(index).get_user_id()
-                message = "投票结束！本轮出局用户: " + MessageSegment.at(user_id)
-
-                # 公布淘汰消息
-                await bot.send_group_msg(group_id=group_id, message=message)
-
-                # 判断游戏是否结束
-                if this_game.is_finished():
-                    this_game.set_game_status(GameStatus.FINISHED)
-                    await start_cmd.skip()
-
-                # 开始自由讨论状态
-                this_game.set_game_status(GameStatus.DISCUSSING)
-                await bot.send_group_msg(group_id=group_id, message="自由讨论时间开始！房主回复: “结束讨论”进行投票！")
-                await start_cmd.reject()
+        scheduler.send_private_msg(bot, user_id, "投票数据不合法，请重新投票！")
+        return
 
-                await start_cmd.reject()
-            case GameStatus.DISCUSSING:
-                await start_cmd.reject()
-            case GameStatus.FINISHED:
-                await start_cmd.skip()
+    message = "未知错误！"
+    match metrics.result("vote", this_game.vote(user_id, seat)):
+        case 0:
+            message = "投票成功！" if seat is not None else "您已弃权！"
+        case 1:
+            message = "本轮投票已经结束！"
+        case 2:
+            message = "您不能参与本轮投票！"
+        case 3:
+            message = "您已经投过票了！"
+        case 4:
+            message = "请投票给存活的玩家！"
+        case 5:
+            message = "不能给自己投票！"
+    scheduler.send_private_msg(bot, user_id, message)
 
 
 @start_cmd.handle()
-async def _(bot: Bot, state: T_State):
+async def _on_game_finish(bot: Bot, state: T_State):
     this_game: Game = state["this_game"]
-    word = this_game.get_word()
     group_id = state["group_id"]
 
     # 判断是否因触发词汇导致游戏结束
     if state.get("触发词汇"):
-        winner_message = f"胜利方: {'卧底' if state['触发词汇']['identity'] == Identity.CIVILIAN else '平民'}\n"
+        winner = '卧底' if state['触发词汇']['identity'] == Identity.CIVILIAN else '平民'
     else:
-        winner_message = f"胜利方: {this_game.get_winner()}\n"
+        winner = this_game.get_winner()
+
+    await this_game.call(_announce_finish, bot, group_id, this_game, winner)
+
+
+# 替换该群当前阶段的定时器，不传入定时器时只取消
+def _set_phase_timers(group_id: int, *handles: TimerHandle):
+    for handle in phase_timers.pop(group_id, ()):
+        handle.cancel()
+    if handles:
+        phase_timers[group_id] = list(handles)
+
+
+# 开始讨论阶段的计时，到时自动开始投票
+def _schedule_discussion(bot: Bot, group_id: int, game: Game):
+    timeout = plugin_config.spy_game_discussion_timeout
+    if not timeout:
+        _set_phase_timers(group_id)
+        return
+
+    handles = [timer_wheel.call_later(timeout, lambda: game.post(_on_discussion_timeout, bot, group_id, game))]
+    reminder = plugin_config.spy_game_reminder_before
+    if reminder and timeout > reminder:
+        message = f"讨论将在{reminder:g}秒后结束，届时自动开始投票！"
+        handles.append(timer_wheel.call_later(timeout - reminder, lambda: _remind(bot, group_id, game, message)))
+    _set_phase_timers(group_id, *handles)
+
+
+def _on_discussion_timeout(bot: Bot, group_id: int, game: Game):
+    if registry.get(group_id) is not game or game.get_status() != GameStatus.DISCUSSING:
+        return
+    scheduler.send_group_msg(bot, group_id, "讨论时间到！", Priority.CRITICAL)
+    _start_vote(bot, group_id, game, True)
+
+
+# 开始投票，auto 表示因讨论超时自动开始
+def _start_vote(bot: Bot, group_id: int, game: Game, auto: bool = False):
+    # 房主结束讨论与讨论超时可能先后到达，只处理先到的一个
+    if registry.get(group_id) is not game or game.get_status() != GameStatus.DISCUSSING:
+        return
+
+    timeout = plugin_config.spy_game_vote_timeout
+    game.start_vote(lambda vote_round: _settle_vote(bot, group_id, game, vote_round, auto),
+                    plugin_config.spy_game_vote_changeable,
+                    timeout)
+
+    lines = [
+        f"-{player.get_seat()}->" + MessageSegment.at(player.get_user_id()) + "\n"
+        for player in game.get_alive_players()
+    ]
+    _send_chunked(bot, group_id, "投票环节开始！请私聊投票对应编号，回复“弃权”放弃投票！\n", lines,
+                  f"投票将在{timeout:g}秒后截止！" if timeout else "")
+    _schedule_vote_reminder(bot, group_id, game)
+
+
+# 投票截止前提醒尚未投票的玩家，截止本身由 VoteRound 计时
+def _schedule_vote_reminder(bot: Bot, group_id: int, game: Game):
+    timeout = plugin_config.spy_game_vote_timeout
+    reminder = plugin_config.spy_game_reminder_before
+    if not timeout or not reminder or timeout <= reminder:
+        _set_phase_timers(group_id)
+        return
+
+    def remind():
+        vote_round = game.get_vote_round()
+        if vote_round is None:
+            return
+        if registry.get(group_id) is not game or game.get_status() != GameStatus.VOTING:
+            return
+        ballots = vote_round.get_ballots()
+        mentions = [
+            MessageSegment.at(player.get_user_id())
+            for player in game.get_alive_players() if player.get_user_id() not in ballots
+        ]
+        _send_chunked(bot, group_id, f"投票将在{reminder:g}秒后截止！尚未投票: ", mentions, priority=Priority.INFO)
+
+    _set_phase_timers(group_id, timer_wheel.call_later(timeout - reminder, remind))
+
+
+def _remind(bot: Bot, group_id: int, game: Game, message: str):
+    if registry.get(group_id) is game and game.get_status() == GameStatus.DISCUSSING:
+        scheduler.send_group_msg(bot, group_id, message)
+
+
+# 结算投票，最后一票投出或投票截止时调用
+def _settle_vote(bot: Bot, group_id: int, game: Game, vote_round: VoteRound, auto: bool = False):
+    # 游戏已被删除或清理
+    if registry.get(group_id) is not game:
+        return
+
+    # 讨论超时后自动开始的投票也无人参与，视为游戏已被放弃
+    if auto and not vote_round.get_ballot_total():
+        event_log.finish(group_id, game, Winner.ABANDONED)
+        registry.remove(group_id, game)
+        scheduler.send_group_msg(bot, group_id, "游戏长时间无人操作，已自动结束！", Priority.CRITICAL)
+        return
+
+    # 结算前按本轮的最终投票记录事件
+    for voter_id, seat in vote_round.get_ballots().items():
+        event_log.vote(group_id, game, voter_id, seat)
+
+    player = game.settle_vote()
+    if player is None:
+        if vote_round.is_tie():
+            event_log.settle(group_id, game, 1)
+            message = "出现平票！本轮没有用户出局！进入自由讨论时间！房主回复: “结束讨论”进行投票！"
+        else:
+            event_log.settle(group_id, game, 2)
+            message = "无人投票！本轮没有用户出局！进入自由讨论时间！房主回复: “结束讨论”进行投票！"
+        scheduler.send_group_msg(bot, group_id, message, Priority.CRITICAL)
+        _schedule_discussion(bot, group_id, game)
+        return
+
+    event_log.out(group_id, game, player.get_user_id())
+    event_log.settle(group_id, game, 0)
+
+    # 公布淘汰消息
+    message = "投票结束！本轮出局用户: " + MessageSegment.at(player.get_user_id())
+    scheduler.send_group_msg(bot, group_id, message, Priority.CRITICAL)
+
+    # 判断游戏是否结束
+    if game.get_status() == GameStatus.FINISHED:
+        _announce_finish(bot, group_id, game, game.get_winner())
+        return
+
+    # 开始自由讨论状态
+    scheduler.send_group_msg(bot, group_id, "自由讨论时间开始！房主回复: “结束讨论”进行投票！", Priority.CRITICAL)
+    _schedule_discussion(bot, group_id, game)
+
+
+def _announce_finish(bot: Bot, group_id: int, game: Game, winner: str):
+    # 游戏已被删除或清理
+    if registry.get(group_id) is not game:
+        return
+
+    word = game.get_word()
 
     # 拼接消息
+    winner_message = f"胜利方: {winner}\n"
     word_message = f"词汇:\n-平民: {word['平民']}\n-卧底: {word['卧底']}\n"
-    spy_message = "卧底: "
-    civilian_message = "平民: "
-    for player in this_game.get_joined_players():
-        if player.get_identity() == Identity.SPY:
-            spy_message += MessageSegment.at(player.get_user_id())
+    camps: dict[Identity, list[MessageSegment]] = {identity: [] for identity in Identity}
+    for player in game.get_joined_players():
+        camps[player.get_identity()].append(MessageSegment.at(player.get_user_id()))
+
+    # 发送结束消息，人数较多时每个阵营的名单分成多条发送
+    scheduler.send_group_msg(bot, group_id, "游戏结束！\n" + winner_message + word_message, Priority.CRITICAL)
+    _send_chunked(bot, group_id, "卧底: ", camps[Identity.SPY])
+    if camps[Identity.BLANK]:
+        _send_chunked(bot, group_id, "白板: ", camps[Identity.BLANK])
+    _send_chunked(bot, group_id, "平民: ", camps[Identity.CIVILIAN])
+
+    event_log.finish(group_id, game, Winner.CIVILIAN if winner == "平民" else Winner.SPY)
+    registry.remove(group_id, game)
+
+
+# 继续重启前进行中的游戏，重新开始本轮投票并恢复游戏会话
+def _resume_game(bot: Bot, group_id: int, game: Game, ballots: list):
+    if registry.get(group_id) is not game:
+        return
+
+    message = "机器人已重启，游戏已恢复！"
+    vote_round = None
+    if game.get_status() == GameStatus.VOTING:
+        vote_round = game.start_vote(lambda this_round: _settle_vote(bot, group_id, game, this_round),
+                                     plugin_config.spy_game_vote_changeable,
+                                     plugin_config.spy_game_vote_timeout)
+        for voter_id, seat in ballots:
+            game.vote(voter_id, seat)
+        message += "本轮投票重新计时，已投票的玩家无需重新投票！"
+    else:
+        message += "房主回复: “结束讨论”进行投票！"
+
+    # 恢复的投票可能已经全部投完并结束了游戏
+    if registry.get(group_id) is not game:
+        return
+    # 投票结算后已经通知了群聊并安排了下一阶段，只需恢复会话
+    if game.get_vote_round() is vote_round:
+        scheduler.send_group_msg(bot, group_id, message, Priority.CRITICAL)
+        if vote_round is not None:
+            _schedule_vote_reminder(bot, group_id, game)
         else:
-            civilian_message += MessageSegment.at(player.get_user_id())
-    message = "游戏结束！\n" + winner_message + word_message + spy_message + "\n" + civilian_message
-
-    # 发送结束消息
-    await bot.send_group_msg(group_id=group_id, message=message)
-
-    games[group_id] = None
+            _schedule_discussion(bot, group_id, game)
+
+    # 与 reject 后的会话相同：下一条消息从接收处理函数开始
+    start_cmd.new("message",
+                  Rule(),
+                  game.get_permission(group_id),
+                  [_on_game_message, _on_game_finish],
+                  temp=True,
+                  priority=0,
+                  block=True,
+                  plugin=start_cmd.plugin,
+                  module=start_cmd.module,
+                  expire_time=driver.config.session_expire_timeout,
+                  default_state={"this_game": game, "group_id": group_id},
+                  default_permission_updater=_update_game_permission)
+
+
+# 将玩家列表分成多条消息发送，每条最多 spy_game_message_chunk_size 项，首条带上标题，末条带上结尾
+def _send_chunked(bot: Bot, group_id: int, header: str, items: list[Message | MessageSegment | str],
+                  footer: str = "", priority: Priority = Priority.CRITICAL):
+    chunk_size = plugin_config.spy_game_message_chunk_size
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)] or [[]]
+    for index, chunk in enumerate(chunks):
+        message = Message(header if index == 0 else f"（续 {index + 1}/{len(chunks)}）\n")
+        for item in chunk:
+            message += item
+        if index == len(chunks) - 1 and footer:
+            message += footer
+        # 同一个群的消息按顺序发送，分段不会乱序
+        scheduler.send_group_msg(bot, group_id, message, priority)
@@ -0,0 +1,103 @@
+from time import monotonic
+from typing import Optional, Union
+from nonebot.log import logger
+from nonebot.adapters.onebot.v11.bot import Bot
+from nonebot.adapters.onebot.v11.message import Message
+from .config import plugin_config
+from .friends import friend_cache
+from .scheduler import scheduler, Priority
+
+
+class BotPool:
+    """
+    已连接的机器人账号池。私聊消息从与玩家是好友的账号中选择待发送消息最少的一个发出，
+    账号连续发送失败时暂停使用一段时间，单条消息发送失败时换下一个账号重试。
+    """
+
+    def __init__(self, failure_limit: int, cooldown: float):
+        self.__failure_limit = failure_limit
+        self.__cooldown = cooldown
+        self.__bots: dict[str, Bot] = {}
+        # 账号 -> 已交给发送调度器但尚未完成的私聊条数
+        self.__load: dict[str, int] = {}
+        # 账号 -> 连续发送失败的次数
+        self.__failures: dict[str, int] = {}
+        # 账号 -> 暂停使用的截止时间
+        self.__cooling: dict[str, float] = {}
+
+    def add(self, bot: Bot):
+        self.__bots[bot.self_id] = bot
+        self.__load.setdefault(bot.self_id, 0)
+        self.__failures.pop(bot.self_id, None)
+        self.__cooling.pop(bot.self_id, None)
+
+    def remove(self, bot: Bot):
+        self.__bots.pop(bot.self_id, None)
+        self.__failures.pop(bot.self_id, None)
+        self.__cooling.pop(bot.self_id, None)
+
+    def get_total(self) -> int:
+        return len(self.__bots)
+
+    def get_load(self) -> dict[str, int]:
+        return {self_id: self.__load.get(self_id, 0) for self_id in self.__bots}
+
+    def is_available(self, bot: Bot) -> bool:
+        until = self.__cooling.get(bot.self_id)
+        if until is None:
+            return True
+        if monotonic() >= until:
+            del self.__cooling[bot.self_id]
+            return True
+        return False
+
+    async def is_friend(self, user_id: int) -> bool:
+        """
+        判断玩家是否与任意一个已连接的账号是好友。
+        """
+        for bot in list(self.__bots.values()):
+            if await friend_cache.is_friend(bot, user_id):
+                return True
+        return False
+
+    async def pick(self, user_id: int, exclude: Union[set[str], tuple] = ()) -> Optional[Bot]:
+        """
+        选择与玩家是好友、未暂停使用且待发送消息最少的账号，没有可用账号时返回 None。
+        所有好友账号都在暂停中时，仍选择其中负载最低的一个。
+        """
+        candidates = [bot for self_id, bot in list(self.__bots.items())
+                      if self_id not in exclude and await friend_cache.is_friend(bot, user_id)]
+        if not candidates:
+            return None
+        available = [bot for bot in candidates if self.is_available(bot)] or candidates
+        return min(available, key=lambda bot: self.__load.get(bot.self_id, 0))
+
+    async def send_private_msg(self, user_id: int, message: Union[str, Message],
+                               priority: Priority = Priority.INFO) -> bool:
+        """
+        通过负载最低的好友账号发送私聊，失败时依次换其他好友账号，所有账号都失败时返回 False。
+        """
+        tried: set[str] = set()
+        while (bot := await self.pick(user_id, tried)) is not None:
+            tried.add(bot.self_id)
+            self.__load[bot.self_id] = self.__load.get(bot.self_id, 0) + 1
+            try:
+                success = await scheduler.send_private_msg(bot, user_id, message, priority)
+            finally:
+                self.__load[bot.self_id] -= 1
+            if success:
+                self.__failures.pop(bot.self_id, None)
+                return True
+            self.__on_failure(bot)
+        return False
+
+    def __on_failure(self, bot: Bot):
+        failures = self.__failures[bot.self_id] = self.__failures.get(bot.self_id, 0) + 1
+        # 单次失败可能只是对方的问题，连续失败才认为账号被限制
+        if failures >= self.__failure_limit and bot.self_id not in self.__cooling:
+            self.__cooling[bot.self_id] = monotonic() + self.__cooldown
+            self.__failures.pop(bot.self_id, None)
+            logger.warning(f"账号 {bot.self_id} 连续 {failures} 次发送失败，暂停使用 {self.__cooldown} 秒")
+
+
+bot_pool = BotPool(plugin_config.spy_game_bot_failure_limit, plugin_config.spy_game_bot_cooldown)
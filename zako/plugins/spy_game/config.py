@@ -0,0 +1,106 @@
+from nonebot import get_plugin_config
+from pydantic import BaseModel, Field
+from .trigger import MatchMode
+
+
+class Config(BaseModel):
+    """
+    卧底游戏插件配置，从 .env 文件中读取。
+    """
+    # 词库文件的路径，以 .bin 结尾时读取编译后的二进制词库
+    spy_game_word_path: str = "data/words.json"
+    # 好友列表完整刷新的间隔（秒）
+    spy_game_friend_ttl: float = 600
+    # 机器人账号连续发送失败多少次后暂停使用
+    spy_game_bot_failure_limit: int = 3
+    # 发送失败的账号暂停使用的时长（秒）
+    spy_game_bot_cooldown: float = 60
+    # 新建游戏的人数上限
+    spy_game_max_players: int = 10
+    # 房主可以设置的人数上限
+    spy_game_max_players_limit: int = 200
+    # 每多少名玩家分配一名卧底，至少一名
+    spy_game_players_per_spy: int = 10
+    # 每多少名玩家分配一名白板，为 0 时没有白板
+    spy_game_players_per_blank: int = 20
+    # 一条消息中最多列出的玩家数量，超出后分成多条发送
+    spy_game_message_chunk_size: int = 20
+    # 开局发放词汇时私聊的最大并发数
+    spy_game_fanout_concurrency: int = 5
+    # 开局发放词汇时每秒最多发送的私聊条数
+    spy_game_fanout_rate: float = 10
+    # 私聊发送失败后的重试次数
+    spy_game_fanout_retries: int = 2
+    # 首次重试前等待的时间（秒），之后每次翻倍
+    spy_game_fanout_retry_delay: float = 0.5
+    # 每个机器人账号的每秒发送条数上限，分片部署时由前端按账号统一限制
+    spy_game_send_rate: float = 5
+    # 空闲后允许连续发送的条数
+    spy_game_send_burst: int = 10
+    # 同时等待响应的发送请求数
+    spy_game_send_concurrency: int = 4
+    # 每个队列最多积压的普通消息条数，超出后丢弃最旧的消息，至少为 1
+    spy_game_send_queue_size: int = Field(20, ge=1)
+    # 同时进行中的游戏数量上限
+    spy_game_max_games: int = 10000
+    # 等待玩家加入的游戏无人操作多久后清理（秒）
+    spy_game_waiting_timeout: float = 1800
+    # 讨论或投票中的游戏无人操作多久后清理（秒）
+    spy_game_playing_timeout: float = 3600
+    # 检查无人操作游戏的间隔（秒）
+    spy_game_sweep_interval: float = 60
+    # 触发词汇的判定方式: char / word / pinyin
+    spy_game_trigger_mode: MatchMode = MatchMode.CHAR
+    # 阶段截止时间的精度（秒）
+    spy_game_timer_tick: float = 1
+    # 讨论阶段的时长（秒），到时自动开始投票，为 0 时不限时
+    spy_game_discussion_timeout: float = 600
+    # 讨论或投票截止前多久发送提醒（秒），为 0 时不提醒
+    spy_game_reminder_before: float = 30
+    # 合并多长时间内的加入和退出后再公布玩家名单（秒），为 0 时立即公布
+    spy_game_roster_delay: float = 3
+    # 投票截止时间（秒），为 0 时不限时
+    spy_game_vote_timeout: float = 120
+    # 是否允许在投票结束前改票
+    spy_game_vote_changeable: bool = False
+    # 游戏状态日志的路径，为空时不记录，重启后也不会恢复游戏
+    spy_game_journal_path: str = "data/spy_game.db"
+    # 游戏状态日志批量写入的间隔（秒）
+    spy_game_journal_flush_interval: float = 1
+    # 每写入多少条记录压缩一次游戏状态日志
+    spy_game_journal_compact_every: int = 1000
+    # 是否丢弃与游戏无关的私聊消息，开启后其他插件收不到私聊，仅在机器人只运行本插件时开启
+    spy_game_drop_private_chatter: bool = False
+    # 对局事件日志的路径，为空时不记录
+    spy_game_event_log_path: str = "data/spy_game_events.bin"
+    # 对局事件批量写入的间隔（秒）
+    spy_game_event_log_flush_interval: float = 5
+    # 启动后立即进行一次性能分析，排查卡顿时可在 .env.prod 中开启
+    spy_game_profile_on_start: bool = False
+    # 每次性能分析的时长（秒）
+    spy_game_profile_duration: float = 60
+    # 性能分析的采样间隔（秒，按 CPU 时间计）
+    spy_game_profile_interval: float = 0.005
+    # 性能分析结果中保留的最慢调用数量
+    spy_game_profile_slowest: int = 50
+    # 性能分析结果的输出目录
+    spy_game_profile_dir: str = "data"
+    # 分片部署中的角色，为空时单进程运行；front 只接收事件并转发，worker 由前端启动并处理游戏
+    spy_game_shard_role: str = ""
+    # 工作进程的数量
+    spy_game_shard_total: int = 0
+    # 当前工作进程的编号，由前端启动工作进程时传入
+    spy_game_shard_index: int = 0
+    # 前端与工作进程通信的 Unix 套接字路径
+    spy_game_shard_socket_path: str = "data/spy_game_shards.sock"
+    # 是否由前端启动并守护工作进程，关闭时需要自行启动 scripts/shard_worker.py
+    spy_game_shard_spawn: bool = True
+    # 工作进程退出后重新启动的等待时间（秒）
+    spy_game_shard_restart_delay: float = 3
+    # 重新分配期间最多暂存的事件数量
+    spy_game_shard_buffer_size: int = 10000
+    # 指标接口的路径，为空时不提供
+    spy_game_metrics_path: str = "/spy_game/metrics"
+
+
+plugin_config = get_plugin_config(Config)
@@ -0,0 +1,91 @@
+from random import randrange
+from typing import Optional
+from .words import word_library
+from .wordstore import WordPair
+
+
+class WordDeck:
+    """
+    单个群选择的词库分类，以及词对下标牌堆。
+    抽牌时按 Fisher-Yates 洗牌的方式每次只交换一个位置，只记录被交换过的位置，
+    占用的内存与已抽出的词对数量成正比，与词库大小无关。
+    牌堆发完或词库变化后重新洗牌，一轮之内不会抽到重复的词对。
+    """
+
+    __slots__ = ("__category", "__remaining", "__swaps", "__pair_total")
+
+    def __init__(self, category: str):
+        self.__category = category
+        # 牌堆中剩余的词对数量，下标 [0, remaining) 为尚未抽出的位置
+        self.__remaining = 0
+        # 被交换过的位置 -> 该位置上的词对下标，未记录的位置保存的就是自身的下标
+        self.__swaps: dict[int, int] = {}
+        self.__pair_total = 0
+
+    def get_category(self):
+        return self.__category
+
+    def get_pair_total(self) -> int:
+        return word_library.get_pair_total(self.__category)
+
+    def get_remaining(self) -> int:
+        return self.__remaining
+
+    def set_category(self, category):
+        # 如果分类不存在，返回1
+        if not word_library.has_category(category):
+            return 1
+
+        # 成功返回0，更换分类后重新洗牌
+        self.__category = category
+        self.__remaining = 0
+        self.__swaps = {}
+        self.__pair_total = 0
+        return 0
+
+    def draw(self) -> Optional[WordPair]:
+        pair_total = self.get_pair_total()
+        if not pair_total:
+            return None
+
+        # 牌堆发完或词库中的词对数量变化时重新洗牌
+        if not self.__remaining or pair_total != self.__pair_total:
+            self.__shuffle(pair_total)
+        return word_library.get_pair(self.__category, self.__pop())
+
+    def __pop(self) -> int:
+        # 随机选出一个剩余位置，把末尾位置的下标换到这里
+        index = randrange(self.__remaining)
+        self.__remaining -= 1
+        last = self.__remaining
+        pair_index = self.__swaps.pop(index, index)
+        if index != last:
+            self.__swaps[index] = self.__swaps.pop(last, last)
+        return pair_index
+
+    def __shuffle(self, pair_total: int):
+        self.__remaining = pair_total
+        self.__swaps = {}
+        self.__pair_total = pair_total
+
+
+class WordDecks:
+    """
+    按群号保存各群的 WordDeck，群第一次开始游戏时才创建。
+    """
+
+    def __init__(self, default_category: str):
+        self.__default_category = default_category
+        self.__decks: dict[int, WordDeck] = {}
+
+    def get(self, group_id) -> WordDeck:
+        deck = self.__decks.get(group_id)
+        if deck is None:
+            deck = self.__decks[group_id] = WordDeck(self.__default_category)
+        return deck
+
+    def get_total(self) -> int:
+        return len(self.__decks)
+
+
+word_decks = WordDecks("默认")
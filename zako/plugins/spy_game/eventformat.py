@@ -0,0 +1,40 @@
+from enum import IntEnum
+from struct import Struct
+
+# 每条事件定长 36 字节: 时间, 游戏编号, 群号, 事件类型, 轮次, 保留, 两个参数
+RECORD = Struct("<dqqBBHii")
+# 与 RECORD 对应的 NumPy 结构，离线分析时直接按列读取
+RECORD_DTYPE = [
+    ("time", "<f8"),
+    ("game_id", "<i8"),
+    ("group_id", "<i8"),
+    ("kind", "u1"),
+    ("round", "u1"),
+    ("reserved", "<u2"),
+    ("a", "<i4"),
+    ("b", "<i4")
+]
+
+
+class EventKind(IntEnum):
+    """
+    事件类型，以及两个参数的含义。
+    """
+    # a: 玩家人数, b: 词对编号
+    START = 1
+    # a: 投票者座位号, b: 被投票的座位号，弃权为 -1
+    VOTE = 2
+    # a: 结果（0 有人出局，1 平票，2 无人投票）, b: 本轮时长（毫秒）
+    ROUND = 3
+    # a: 出局玩家的座位号, b: 身份
+    OUT = 4
+    # a: 触发词汇玩家的座位号, b: 身份
+    TRIGGER = 5
+    # a: 胜利方（0 平民，1 卧底，2 无人操作而结束）, b: 存活人数
+    FINISH = 6
+
+
+class Winner(IntEnum):
+    CIVILIAN = 0
+    SPY = 1
+    ABANDONED = 2
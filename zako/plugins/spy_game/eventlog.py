@@ -0,0 +1,124 @@
+import os
+import json
+import asyncio
+from time import time
+from typing import Optional
+from nonebot.log import logger
+from .game import Game
+from .config import plugin_config
+from .eventformat import RECORD, EventKind, Winner
+
+
+class EventLog:
+    """
+    只追加的对局事件日志。事件打包为定长记录写入内存缓冲区，由后台任务定期在线程中写入文件。
+    词对单独保存在同名的 .pairs 文件中（每行一个 JSON 数组，行号即词对编号），事件中只记录编号。
+    """
+
+    def __init__(self, path: str, flush_interval: float):
+        self.__path = path
+        self.__flush_interval = flush_interval
+        self.__buffer = bytearray()
+        self.__pairs: dict[tuple[str, str], int] = {}
+        self.__new_pairs: list[tuple[str, str]] = []
+        # 游戏编号 -> (当前轮次, 本轮开始时间)
+        self.__rounds: dict[int, tuple[int, float]] = {}
+        self.__task: Optional[asyncio.Task] = None
+
+    def start_game(self, group_id: int, game: Game):
+        if self.__task is None:
+            return
+        word = game.get_word()
+        pair = (word["平民"], word["卧底"])
+        pair_id = self.__pairs.get(pair)
+        if pair_id is None:
+            pair_id = self.__pairs[pair] = len(self.__pairs)
+            self.__new_pairs.append(pair)
+        self.__rounds[game.get_game_id()] = (1, time())
+        self.__record(group_id, game, EventKind.START, game.get_player_total(), pair_id)
+
+    def vote(self, group_id: int, game: Game, user_id: int, seat: Optional[int]):
+        self.__record(group_id, game, EventKind.VOTE, game.get_player(user_id).get_seat(), -1 if seat is None else seat)
+
+    def settle(self, group_id: int, game: Game, outcome: int):
+        game_id = game.get_game_id()
+        round_index, started_at = self.__rounds.get(game_id, (1, time()))
+        self.__record(group_id, game, EventKind.ROUND, outcome, int((time() - started_at) * 1000))
+        self.__rounds[game_id] = (round_index + 1, time())
+
+    def out(self, group_id: int, game: Game, user_id: int):
+        player = game.get_player(user_id)
+        self.__record(group_id, game, EventKind.OUT, player.get_seat(), player.get_identity().value)
+
+    def trigger(self, group_id: int, game: Game, user_id: int):
+        player = game.get_player(user_id)
+        self.__record(group_id, game, EventKind.TRIGGER, player.get_seat(), player.get_identity().value)
+
+    def finish(self, group_id: int, game: Game, winner: Winner):
+        self.__record(group_id, game, EventKind.FINISH, winner, game.get_alive_total())
+        self.__rounds.pop(game.get_game_id(), None)
+
+    def start(self):
+        if self.__task is None and self.__path:
+            self.__load_pairs()
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+            await self.flush()
+
+    async def flush(self):
+        if not self.__buffer and not self.__new_pairs:
+            return
+        # 先交换缓冲区，写入期间记录的新事件进入新的缓冲区
+        buffer, self.__buffer = self.__buffer, bytearray()
+        pairs, self.__new_pairs = self.__new_pairs, []
+        try:
+            await asyncio.to_thread(self.__write, bytes(buffer), pairs)
+        except OSError as e:
+            logger.error(f"写入对局事件失败: {e}")
+
+    def __record(self, group_id: int, game: Game, kind: EventKind, a: int, b: int):
+        if self.__task is None:
+            return
+        round_index = self.__rounds.get(game.get_game_id(), (0, 0))[0]
+        self.__buffer += RECORD.pack(time(), game.get_game_id(), group_id, kind, min(round_index, 255), 0, a, b)
+
+    def __load_pairs(self):
+        try:
+            with open(f"{self.__path}.pairs", "r", encoding="utf-8") as file:
+                for line in file:
+                    civilian_word, spy_word = json.loads(line)
+                    self.__pairs[(civilian_word, spy_word)] = len(self.__pairs)
+        except FileNotFoundError:
+            pass
+
+    def __write(self, buffer: bytes, pairs: list[tuple[str, str]]):
+        if os.path.dirname(self.__path):
+            os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+        # 先写入词对，保证事件中引用的编号都能找到
+        if pairs:
+            with open(f"{self.__path}.pairs", "a", encoding="utf-8") as file:
+                file.writelines(json.dumps(pair, ensure_ascii=False) + "\n" for pair in pairs)
+        if buffer:
+            with open(self.__path, "ab") as file:
+                file.write(buffer)
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.__flush_interval)
+            await self.flush()
+
+
+def get_event_log_path() -> str:
+    # 分片部署时每个工作进程写入各自的文件，游戏和词对编号互不冲突
+    path = plugin_config.spy_game_event_log_path
+    if path and plugin_config.spy_game_shard_role == "worker":
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{plugin_config.spy_game_shard_index}{ext}"
+    return path
+
+
+event_log = EventLog(get_event_log_path(), plugin_config.spy_game_event_log_flush_interval)
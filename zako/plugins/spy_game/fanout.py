@@ -0,0 +1,57 @@
+import asyncio
+from time import perf_counter
+from nonebot.log import logger
+from .ratelimit import TokenBucket
+from .scheduler import Priority
+from .botpool import bot_pool
+from .stats import LatencyStats
+from .metrics import metrics
+
+
+class PrivateFanout:
+    """
+    并发发送私聊消息，受并发数与发送速率限制，失败时按指数退避重试。
+    消息由账号池选择好友账号后经发送调度器发出，同时受各账号的限速约束。
+    """
+
+    def __init__(self, concurrency: int, rate: float, retries: int, retry_delay: float):
+        self.__semaphore = asyncio.Semaphore(concurrency)
+        self.__bucket = TokenBucket(rate, concurrency)
+        self.__retries = retries
+        self.__retry_delay = retry_delay
+        self.__latency = LatencyStats()
+        self.__failures = 0
+
+    def get_latency(self) -> LatencyStats:
+        return self.__latency
+
+    def get_failures(self) -> int:
+        return self.__failures
+
+    async def send(self, group_id: int, messages: dict[int, str]) -> list[int]:
+        """
+        发送 {user_id: message}，返回所有重试后仍发送失败的 user_id。
+        """
+        user_ids = list(messages.keys())
+        start = perf_counter()
+        results = await asyncio.gather(*(self.__send_one(user_id, messages[user_id]) for user_id in user_ids))
+        metrics.observe("spy_game_fanout_duration_seconds", perf_counter() - start)
+        logger.debug(f"群 {group_id} 的私聊发送完成 {len(user_ids)} 条，耗时 {self.__latency}")
+        return [user_id for user_id, success in zip(user_ids, results) if not success]
+
+    async def __send_one(self, user_id: int, message: str) -> bool:
+        async with self.__semaphore:
+            for attempt in range(self.__retries + 1):
+                await self.__bucket.acquire()
+                start = perf_counter()
+                if await bot_pool.send_private_msg(user_id, message, Priority.CRITICAL):
+                    elapsed = perf_counter() - start
+                    self.__latency.record(elapsed)
+                    metrics.observe("spy_game_fanout_send_seconds", elapsed)
+                    return True
+
+                logger.warning(f"向 {user_id} 发送私聊失败（第 {attempt + 1} 次）")
+                self.__failures += 1
+                if attempt < self.__retries:
+                    await asyncio.sleep(self.__retry_delay * 2 ** attempt)
+        return False
@@ -0,0 +1,69 @@
+import asyncio
+from time import monotonic
+from nonebot.log import logger
+from nonebot.adapters.onebot.v11.bot import Bot
+from .config import plugin_config
+
+
+class FriendCache:
+    """
+    按机器人账号缓存好友集合，判断好友关系时不再请求完整的好友列表。
+    集合在收到好友相关事件时就地更新，并按 TTL 在后台完整刷新。
+    """
+
+    def __init__(self, ttl: float):
+        self.__ttl = ttl
+        self.__friends: dict[str, set[int]] = {}
+        self.__loaded_at: dict[str, float] = {}
+        self.__refreshing: dict[str, asyncio.Task] = {}
+
+    async def refresh(self, bot: Bot):
+        friends = await bot.get_friend_list()
+        self.__friends[bot.self_id] = {friend["user_id"] for friend in friends}
+        self.__loaded_at[bot.self_id] = monotonic()
+
+    async def is_friend(self, bot: Bot, user_id: int) -> bool:
+        friends = self.__friends.get(bot.self_id)
+
+        # 首次使用时必须等待加载完成
+        if friends is None:
+            await self.__refresh_once(bot)
+            friends = self.__friends.get(bot.self_id, set())
+        # 缓存过期时先使用旧数据，在后台刷新
+        elif monotonic() - self.__loaded_at[bot.self_id] > self.__ttl:
+            self.__refresh_once(bot)
+
+        return user_id in friends
+
+    def add(self, bot: Bot, user_id: int):
+        friends = self.__friends.get(bot.self_id)
+        if friends is not None:
+            friends.add(user_id)
+
+    def remove(self, bot: Bot, user_id: int):
+        friends = self.__friends.get(bot.self_id)
+        if friends is not None:
+            friends.discard(user_id)
+
+    def forget(self, bot: Bot):
+        self.__friends.pop(bot.self_id, None)
+        self.__loaded_at.pop(bot.self_id, None)
+
+    def __refresh_once(self, bot: Bot) -> asyncio.Task:
+        # 同一账号同时只进行一次刷新
+        task = self.__refreshing.get(bot.self_id)
+        if task is None:
+            task = asyncio.create_task(self.__refresh(bot))
+            self.__refreshing[bot.self_id] = task
+        return task
+
+    async def __refresh(self, bot: Bot):
+        try:
+            await self.refresh(bot)
+        except Exception as e:
+            logger.warning(f"刷新 {bot.self_id} 的好友列表失败: {e}")
+        finally:
+            self.__refreshing.pop(bot.self_id, None)
+
+
+friend_cache = FriendCache(plugin_config.spy_game_friend_ttl)
@@ -1,74 +1,177 @@
-import json
-from typing import Optional
-from random import sample, choice, randint
-from nonebot import get_bot
+from typing import Any, Callable, Optional, ValuesView
+from random import sample, randint, getrandbits
+from nonebot.permission import Permission
 from .player import Player
+from .words import word_library
+from .botpool import bot_pool
+from .config import plugin_config
+from .trigger import TriggerMatcher
+from .vote import VoteRound
+from .decks import WordDeck
+from .permission import GameUser
+from .routing import router
+from .mailbox import Mailbox
 from .status import GameStatus, PlayerStatus
 from .identity import Identity
 
 
-class Game:
-    __word_category = "默认"
+GameListener = Callable[["Game", str, Optional[int]], None]
+
 
+class Game:
     def __init__(self, host_user_id: int):
         self.__status: GameStatus = GameStatus.WAITING
+        # 卧底和白板的人数在开始游戏时按人数确定
         self.__spy_players = 1
+        self.__blank_players = 0
         self.__min_players = 3
-        self.__max_players = 10
+        self.__max_players = plugin_config.spy_game_max_players
         self.__host_user_id = host_user_id
-        self.__ban_list = []
-        self.__player_list = []
-        self.__civilian_list = []
-        self.__spy_list = []
+        # 创建游戏的机器人账号，重启后只通过该账号继续游戏
+        self.__self_id: Optional[str] = None
+        # 开始游戏时生成的随机编号，用于在对局事件中区分每一局
+        self.__game_id = 0
+        # 以 user_id 为键保存玩家，字典保持加入顺序
+        self.__ban_set: set[int] = set()
+        self.__players: dict[int, Player] = {}
+        self.__alive: dict[int, Player] = {}
+        self.__civilians: dict[int, Player] = {}
+        self.__spies: dict[int, Player] = {}
+        self.__blanks: dict[int, Player] = {}
+        # 开始游戏时按加入顺序分配座位，座位号即列表下标
+        self.__seats: list[Player] = []
         self.__word = {"平民": None, "卧底": None}
-
-    @classmethod
-    def change_global_word(cls, word):
-        words = Game.get_words()
-        words = words.keys()
-
-        if word not in words:
-            return 1
-
-        cls.__word_category = word
-        return 0
+        self.__trigger: Optional[TriggerMatcher] = None
+        self.__vote_round: Optional[VoteRound] = None
+        self.__listeners: list[GameListener] = []
+        # 会话权限使用的用户集合，随玩家变化增量更新
+        self.__group_users: set[int] = set()
+        self.__permission: Optional[Permission] = None
+        # 渲染好的玩家名单，玩家变化后重新生成
+        self.__roster: Optional[str] = None
+        # 修改游戏状态的指令都通过队列逐条执行
+        self.__mailbox = Mailbox()
 
     @staticmethod
-    def get_words() -> dict:
-        with open("data/words.json", "r", encoding="utf-8") as file:
-            words = json.load(file)
-        return words
+    def get_words():
+        return word_library.get_categories()
+
+    @classmethod
+    def load(cls, data: dict[str, Any]) -> "Game":
+        game = cls(data["host_user_id"])
+        game.__spy_players = data["spy_players"]
+        game.__blank_players = data.get("blank_players", 0)
+        game.__min_players = data["min_players"]
+        game.__max_players = data["max_players"]
+        game.__ban_set = set(data["bans"])
+        game.__game_id = data.get("game_id", 0)
+        game.__self_id = data.get("self_id")
+        for user_id, status, identity in data["players"]:
+            player = Player(user_id)
+            player.set_status(PlayerStatus(status))
+            player.set_identity(Identity(identity))
+            game.__players[user_id] = player
+            if player.get_status() == PlayerStatus.GAMING:
+                game.__group_users.add(user_id)
+        game.__group_users.add(game.__host_user_id)
+
+        if data["started"]:
+            game.__set_seats()
+            game.__alive = {
+                user_id: player for user_id, player in game.__players.items()
+                if player.get_status() == PlayerStatus.GAMING
+            }
+            for user_id, player in game.__alive.items():
+                game.__get_camp(player.get_identity())[user_id] = player
+            game.__word["平民"], game.__word["卧底"] = data["word"]
+            game.__set_trigger()
+
+        # 投票轮次需要由调用方通过 start_vote 重新开始
+        game.__status = GameStatus(data["status"])
+        return game
+
+    def dump(self) -> dict[str, Any]:
+        vote_round = self.__vote_round
+        return {
+            "status": self.__status.value,
+            "host_user_id": self.__host_user_id,
+            "game_id": self.__game_id,
+            "self_id": self.__self_id,
+            "spy_players": self.__spy_players,
+            "blank_players": self.__blank_players,
+            "min_players": self.__min_players,
+            "max_players": self.__max_players,
+            "bans": list(self.__ban_set),
+            "players": [
+                [player.get_user_id(), player.get_status().value, player.get_identity().value]
+                for player in self.__players.values()
+            ],
+            "started": bool(self.__seats),
+            "word": [self.__word["平民"], self.__word["卧底"]],
+            "ballots": list(vote_round.get_ballots().items()) if vote_round is not None else []
+        }
+
+    def add_listener(self, listener: GameListener):
+        self.__listeners.append(listener)
+
+    async def call(self, func: Callable[..., Any], *args) -> Any:
+        return await self.__mailbox.call(func, *args)
+
+    def post(self, func: Callable[..., Any], *args):
+        self.__mailbox.post(func, *args)
+
+    def get_queue_depth(self) -> int:
+        return self.__mailbox.get_depth()
+
+    def get_mailbox(self) -> Mailbox:
+        return self.__mailbox
 
     def get_host_user_id(self):
         return self.__host_user_id
 
-    def get_alive_players(self) -> list[Player]:
-        return self.__civilian_list + self.__spy_list
+    def get_game_id(self):
+        return self.__game_id
+
+    def get_alive_players(self) -> ValuesView[Player]:
+        return self.__alive.values()
+
+    def get_alive_total(self):
+        return len(self.__alive)
 
     def get_player_total(self):
-        return len(self.__player_list)
+        return len(self.__players)
 
-    def get_joined_players(self) -> list[Player]:
-        return self.__player_list
+    def get_joined_players(self) -> ValuesView[Player]:
+        return self.__players.values()
 
     def get_max_players(self):
         return self.__max_players
 
+    def get_roster(self) -> str:
+        if self.__roster is None:
+            self.__roster = f"人数: {len(self.__players)}/{self.__max_players}\n已加入玩家QQ号:\n" \
+                            + "\n".join(f"-{user_id}" for user_id in self.__players)
+        return self.__roster
+
     def get_player(self, user_id) -> Optional[Player]:
-        for player in self.__player_list:
-            if player.get_user_id() == user_id:
-                return player
-        else:
-            return None
+        return self.__players.get(user_id)
+
+    def get_spy_players(self):
+        return self.__spy_players
+
+    def get_blank_players(self):
+        return self.__blank_players
 
     def get_winner(self):
-        if not self.__spy_list:
+        if not self.__spies and not self.__blanks:
             return "平民"
-        elif len(self.get_alive_players()) <= 2:
+        elif self.__is_outnumbered():
             return "间谍"
 
-    def get_player_with_index(self, index) -> Player:
-        return self.__player_list[index]
+    def get_player_with_index(self, index) -> Optional[Player]:
+        if 0 <= index < len(self.__seats):
+            return self.__seats[index]
+        return None
 
     def get_status(self):
         return self.__status
@@ -76,36 +179,97 @@ class Game:
     def get_word(self):
         return self.__word
 
+    def get_self_id(self) -> Optional[str]:
+        return self.__self_id
+
+    def set_self_id(self, self_id: str):
+        self.__self_id = self_id
+
+    def get_vote_round(self) -> Optional[VoteRound]:
+        return self.__vote_round
+
+    def get_permission(self, group_id) -> Permission:
+        # 同一局游戏始终返回同一个权限对象，玩家变化时只更新其中的集合
+        if self.__permission is None:
+            self.__permission = Permission(GameUser(group_id, self.__group_users))
+        return self.__permission
+
+    def close_session(self):
+        # 游戏结束或被移除后不再有用户能进入会话，残留的会话不会再拦截群消息
+        self.__group_users.clear()
+
+    def is_triggered(self, player: Player, message: str) -> bool:
+        return self.__trigger.match(player.get_identity(), message)
+
     def is_finished(self):
-        if not self.__spy_list:
+        if not self.__spies and not self.__blanks:
             return True
-        if len(self.get_alive_players()) <= 2:
+        if self.__is_outnumbered():
             return True
 
         return False
 
+    def __is_outnumbered(self):
+        # 存活的平民不多于卧底和白板时卧底胜利，只有一名卧底时即存活人数不超过 2
+        return len(self.__civilians) <= len(self.__spies) + len(self.__blanks)
+
+    def __get_camp(self, identity: Identity) -> dict[int, Player]:
+        match identity:
+            case Identity.SPY:
+                return self.__spies
+            case Identity.BLANK:
+                return self.__blanks
+        return self.__civilians
+
+    def __notify(self, kind: str, user_id: Optional[int] = None):
+        for listener in self.__listeners:
+            listener(self, kind, user_id)
+
     def __is_full(self):
-        return len(self.__player_list) >= self.__max_players
-
-    def __set_spy_players(self):
-        self.__spy_list = sample(self.__player_list, self.__spy_players)
-        for player in self.__spy_list:
-            player.set_identity(Identity.SPY)
-        self.__civilian_list = list(set(self.__player_list) - set(self.__spy_list))
-
-    def __set_word(self):
-        with open("data/words.json", "r", encoding="utf-8") as file:
-            words: dict = json.load(file)
-        category_words = words.get(self.__word_category)
-        word: list = choice(category_words)
-        self.__word["平民"] = word.pop(randint(0, 1))
-        self.__word["卧底"] = word.pop()
+        return len(self.__players) >= self.__max_players
+
+    def __set_seats(self):
+        self.__seats = list(self.__players.values())
+        for seat, player in enumerate(self.__seats):
+            player.set_seat(seat)
+        self.__alive = dict(self.__players)
+
+    def __set_identities(self):
+        player_total = len(self.__seats)
+        self.__spy_players = max(1, player_total // plugin_config.spy_game_players_per_spy)
+        players_per_blank = plugin_config.spy_game_players_per_blank
+        blank_players = player_total // players_per_blank if players_per_blank else 0
+        # 开局时卧底和白板必须少于平民
+        self.__blank_players = max(0, min(blank_players, (player_total - 1) // 2 - self.__spy_players))
+
+        chosen = sample(self.__seats, self.__spy_players + self.__blank_players)
+        for index, player in enumerate(chosen):
+            player.set_identity(Identity.SPY if index < self.__spy_players else Identity.BLANK)
+            self.__get_camp(player.get_identity())[player.get_user_id()] = player
+        self.__civilians = {
+            user_id: player for user_id, player in self.__players.items()
+            if user_id not in self.__spies and user_id not in self.__blanks
+        }
+
+    def __set_word(self, deck: WordDeck):
+        word = deck.draw()
+        index = randint(0, 1)
+        self.__word["平民"] = word[index]
+        self.__word["卧底"] = word[1 - index]
+        self.__set_trigger()
+
+    def __set_trigger(self):
+        self.__trigger = TriggerMatcher({
+            Identity.CIVILIAN: self.__word["平民"],
+            Identity.SPY: self.__word["卧底"]
+        }, plugin_config.spy_game_trigger_mode)
 
     def change_word(self):
         ...
 
     def set_game_status(self, status: GameStatus):
         self.__status = status
+        self.__notify("status")
 
     def set_max_players(self, user_id, max_players):
         # 如果游戏已经开始，返回1
@@ -120,17 +284,29 @@ class Game:
         if self.__min_players > max_players:
             return 3
 
+        # 如果超过可以设置的上限，返回4
+        if max_players > plugin_config.spy_game_max_players_limit:
+            return 4
+
+        # 如果已加入的人数超过新的上限，返回5
+        if len(self.__players) > max_players:
+            return 5
+
         # 成功返回0
         self.__max_players = max_players
+        self.__roster = None
+        self.__notify("config")
         return 0
 
     def set_out(self, index):
-        player = self.__player_list[index]
+        player = self.__seats[index]
+        user_id = player.get_user_id()
         player.set_status(PlayerStatus.OUT)
-        if player in self.__spy_list:
-            self.__spy_list.remove(player)
-        else:
-            self.__civilian_list.remove(player)
+        self.__alive.pop(user_id, None)
+        self.__get_camp(player.get_identity()).pop(user_id, None)
+        if user_id != self.__host_user_id:
+            self.__group_users.discard(user_id)
+        self.__notify("out", user_id)
 
     async def add_player(self, user_id):
         # 判断游戏是否已经开始
@@ -140,23 +316,23 @@ class Game:
         if self.__is_full():
             return 2
         # 判断玩家是否被踢
-        for player in self.__ban_list:
-            if player == user_id:
-                return 3
+        if user_id in self.__ban_set:
+            return 3
         # 判断是否有机器人好友
-        bot = get_bot()
-        friends = await bot.get_friend_list()
-        for friend in friends:
-            if friend["user_id"] == user_id:
-                break
-        else:
+        if not await bot_pool.is_friend(user_id):
             return 4
         # 判断玩家是否加入
-        for player in self.__player_list:
-            if player.get_user_id() == user_id:
-                return 5
-
-        self.__player_list.append(Player(user_id))
+        if user_id in self.__players:
+            return 5
+        # 判断玩家是否在其他群的游戏中
+        route = router.get(user_id)
+        if route is not None and route[1] is not self:
+            return 6
+
+        self.__players[user_id] = Player(user_id)
+        self.__group_users.add(user_id)
+        self.__roster = None
+        self.__notify("join", user_id)
         return 0
 
     def delete_player(self, user_id):
@@ -167,11 +343,12 @@ class Game:
         if user_id == self.__host_user_id:
             return 2
         # 判断玩家是否加入
-        for player in self.__player_list:
-            if player.get_user_id() == user_id:
-                self.__player_list.remove(player)
-                return 0
-        return 3
+        if self.__players.pop(user_id, None) is None:
+            return 3
+        self.__group_users.discard(user_id)
+        self.__roster = None
+        self.__notify("leave", user_id)
+        return 0
 
     def ban_player(self, user_id, ban_user_id):
         # 判断执行指令的用户是否为房主
@@ -180,10 +357,12 @@ class Game:
         # 判断数据是否合法
         if ban_user_id is None or not ban_user_id.isdigit():
             return 5
-        self.__ban_list.append(int(ban_user_id))
+        ban_user_id = int(ban_user_id)
+        self.__ban_set.add(ban_user_id)
+        self.__notify("ban", ban_user_id)
         return self.delete_player(ban_user_id)
 
-    def start(self, user_id):
+    def start(self, user_id, deck: WordDeck):
         # 判断是否为房主
         if user_id != self.__host_user_id:
             return 1
@@ -196,8 +375,53 @@ class Game:
         if self.get_player_total() < self.__min_players:
             return 3
 
+        # 判断词库是否可用
+        if not deck.get_pair_total():
+            return 4
+
         self.__status = GameStatus.DISCUSSING
-        self.__set_spy_players()
-        self.__set_word()
+        self.__game_id = getrandbits(63)
+        self.__set_seats()
+        self.__set_identities()
+        self.__set_word(deck)
+        self.__notify("start")
 
         return 0
+
+    def start_vote(self,
+                   on_close: Callable[[VoteRound], None],
+                   changeable: bool = False,
+                   timeout: Optional[float] = None) -> VoteRound:
+        candidates = {player.get_seat(): user_id for user_id, player in self.__alive.items()}
+        self.__vote_round = VoteRound(self.__alive.keys(), candidates, on_close, changeable, timeout, self.post)
+        self.__status = GameStatus.VOTING
+        self.__notify("vote_start")
+        return self.__vote_round
+
+    def vote(self, user_id, seat: Optional[int]):
+        # 如果不在投票环节，返回1
+        if self.__status != GameStatus.VOTING or self.__vote_round is None:
+            return 1
+
+        vote_round = self.__vote_round
+        result = vote_round.vote(user_id, seat)
+        # 最后一票会同步结束本轮，结算时已经通知过，不再通知这张选票
+        if result == 0 and not vote_round.is_closed():
+            self.__notify("vote", user_id)
+        return result
+
+    def settle_vote(self) -> Optional[Player]:
+        seat = self.__vote_round.get_result()
+        self.__vote_round = None
+
+        # 平票或无人投票时没有玩家出局，回到讨论环节
+        if seat is None:
+            self.__status = GameStatus.DISCUSSING
+            self.__notify("settle")
+            return None
+
+        player = self.__seats[seat]
+        self.set_out(seat)
+        self.__status = GameStatus.FINISHED if self.is_finished() else GameStatus.DISCUSSING
+        self.__notify("settle")
+        return player
@@ -4,3 +4,5 @@ from enum import Enum
 class Identity(Enum):
     CIVILIAN = 0
     SPY = 1
+    # 白板没有词汇，与卧底同一阵营
+    BLANK = 2
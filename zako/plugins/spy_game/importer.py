@@ -0,0 +1,163 @@
+import os
+import csv
+import json
+from typing import Iterator, Optional
+from .identity import Identity
+from .trigger import MatchMode, TriggerMatcher
+from .wordstore import WordPair, WordStore, build
+
+# 支持的导入格式及对应的文件扩展名
+FORMATS = {".csv": "csv", ".tsv": "tsv", ".jsonl": "jsonl"}
+
+
+class WordImporter:
+    """
+    词库导入。逐行读取 CSV / TSV / JSONL 文件，校验并去重后合并到词库，
+    不会一次性将输入文件读入内存，最后整体替换词库文件，运行中的机器人会自动重新加载。
+    """
+
+    def __init__(self, mode: MatchMode, default_category: str = "默认"):
+        # 未安装 pypinyin 时与游戏中一样退回为单字匹配
+        self.__mode = TriggerMatcher({}, mode).get_mode()
+        self.__default_category = default_category
+        self.__categories: dict[str, list[WordPair]] = {}
+        # 所有分类中已有的词对，不区分两个词的顺序
+        self.__seen: set[WordPair] = set()
+        self.__pair_total = 0
+        # 已有词库中重复的词对数量
+        self.__duplicate_total = 0
+
+    def get_categories(self) -> dict[str, list[WordPair]]:
+        return self.__categories
+
+    def get_pair_total(self):
+        return self.__pair_total
+
+    def get_duplicate_total(self):
+        return self.__duplicate_total
+
+    def load(self, path: str):
+        """
+        读取已有的词库。已有的词对不再校验，全部原样保留，只用于新词对的去重；其中重复的词对只计数。
+        """
+        if path.endswith(".bin"):
+            store = WordStore(path)
+            try:
+                for category in store.get_categories():
+                    for index in range(store.get_pair_total(category)):
+                        self.__keep(category, store.get_pair(category, index))
+            finally:
+                store.close()
+            return
+
+        with open(path, "r", encoding="utf-8") as file:
+            words: dict = json.load(file)
+        for category, pairs in words.items():
+            for pair in pairs:
+                if len(pair) == 2:
+                    self.__keep(category, (pair[0], pair[1]))
+
+    def add(self, category: str, first, second):
+        # 如果词汇不是字符串或为空，返回2
+        if not isinstance(first, str) or not isinstance(second, str):
+            return 2
+        first, second = first.strip(), second.strip()
+        if not category or not first or not second:
+            return 2
+
+        # 如果两个词相同，返回3
+        if first == second:
+            return 3
+
+        # 如果一方的词汇会触发另一方，开局后玩家一说出自己的词就会结束游戏，返回4
+        trigger = TriggerMatcher({Identity.CIVILIAN: first, Identity.SPY: second}, self.__mode)
+        if trigger.match(Identity.CIVILIAN, second) or trigger.match(Identity.SPY, first):
+            return 4
+
+        # 如果词对已经存在于任意分类中，返回5
+        if not self.__merge(category, (first, second)):
+            return 5
+
+        # 成功返回0
+        return 0
+
+    def read(self, path: str, file_format: Optional[str] = None) -> Iterator[tuple[int, int]]:
+        """
+        逐行导入文件，依次产出每一行的行号与导入结果，无法解析的行结果为1。
+        """
+        if file_format is None:
+            file_format = FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format not in FORMATS.values():
+            raise ValueError(f"无法识别的文件格式: {path}")
+
+        with open(path, "r", encoding="utf-8-sig", newline="") as file:
+            if file_format == "jsonl":
+                rows = (self.__parse_json(line) for line in file)
+            else:
+                rows = csv.reader(file, delimiter="\t" if file_format == "tsv" else ",")
+
+            for line, row in enumerate(rows, 1):
+                if row is None:
+                    yield line, 1
+                    continue
+                # 跳过空行
+                if not any(row):
+                    continue
+
+                match len(row):
+                    case 2:
+                        yield line, self.add(self.__default_category, row[0], row[1])
+                    case 3:
+                        yield line, self.add(str(row[0]).strip(), row[1], row[2])
+                    case _:
+                        yield line, 1
+
+    def write(self, path: str) -> int:
+        """
+        写入临时文件后整体替换词库文件，返回写入的词对数量。
+        """
+        if path.endswith(".bin"):
+            return build(self.__categories, path)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({category: [list(pair) for pair in pairs] for category, pairs in self.__categories.items()},
+                      file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        return self.get_pair_total()
+
+    def __merge(self, category: str, pair: WordPair) -> bool:
+        if self.__get_key(pair) in self.__seen:
+            return False
+        self.__keep(category, pair)
+        return True
+
+    def __keep(self, category: str, pair: WordPair):
+        key = self.__get_key(pair)
+        if key in self.__seen:
+            self.__duplicate_total += 1
+        self.__seen.add(key)
+        self.__categories.setdefault(category, []).append(pair)
+        self.__pair_total += 1
+
+    @staticmethod
+    def __get_key(pair: WordPair) -> WordPair:
+        return (pair[0], pair[1]) if pair[0] <= pair[1] else (pair[1], pair[0])
+
+    @staticmethod
+    def __parse_json(line: str) -> Optional[list]:
+        line = line.strip()
+        if not line:
+            return []
+        try:
+            row = json.loads(line)
+        except ValueError:
+            return None
+
+        # 支持 ["词1", "词2"]、["分类", "词1", "词2"] 和 {"category": "分类", "words": ["词1", "词2"]}
+        if isinstance(row, dict):
+            words = row.get("words")
+            if not isinstance(words, list):
+                return None
+            return [row.get("category", ""), *words] if "category" in row else words
+        return row if isinstance(row, list) else None
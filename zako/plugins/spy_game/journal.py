@@ -0,0 +1,141 @@
+import json
+import queue
+import sqlite3
+import asyncio
+import threading
+from os import makedirs
+from os.path import dirname
+from typing import Any, Optional
+from nonebot.log import logger
+from .config import plugin_config
+
+
+class GameJournal:
+    """
+    游戏状态日志。每次状态变化追加一条记录（该局游戏变化后的完整状态），
+    由后台线程批量写入 SQLite，不阻塞消息处理。
+    每写入一定条数后压缩一次，每个群只保留最新的一条，即当前所有游戏的快照。
+    """
+
+    def __init__(self, path: str, flush_interval: float, compact_every: int):
+        self.__path = path
+        self.__flush_interval = flush_interval
+        self.__compact_every = compact_every
+        self.__queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__thread: Optional[threading.Thread] = None
+
+    def record(self, group_id: int, kind: str, state: Optional[dict[str, Any]]):
+        """
+        记录一次状态变化，state 为 None 表示该群的游戏已被移除。
+        """
+        if self.__thread is not None:
+            self.__queue.put((group_id, kind, state))
+
+    async def flush(self):
+        """
+        等待此前记录的状态变化全部写入，用于交出游戏前确保其他进程能读到最新的状态。
+        """
+        if self.__thread is not None:
+            written = threading.Event()
+            self.__queue.put(written)
+            await asyncio.to_thread(written.wait)
+
+    async def restore(self) -> dict[int, dict[str, Any]]:
+        """
+        读取每个群最新的游戏状态，用于重启后恢复。
+        """
+        if not self.__path:
+            return {}
+        return await asyncio.to_thread(self.__restore)
+
+    def start(self):
+        if self.__thread is None and self.__path:
+            self.__thread = threading.Thread(target=self.__run, name="spy_game_journal", daemon=True)
+            self.__thread.start()
+
+    async def stop(self):
+        if self.__thread is not None:
+            self.__queue.put(None)
+            await asyncio.to_thread(self.__thread.join)
+            self.__thread = None
+
+    def __connect(self) -> sqlite3.Connection:
+        if dirname(self.__path):
+            makedirs(dirname(self.__path), exist_ok=True)
+        connection = sqlite3.connect(self.__path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                state TEXT
+            )
+        """)
+        return connection
+
+    def __restore(self) -> dict[int, dict[str, Any]]:
+        connection = self.__connect()
+        try:
+            self.__compact(connection)
+            rows = connection.execute("SELECT group_id, state FROM journal WHERE state IS NOT NULL").fetchall()
+        finally:
+            connection.close()
+        return {group_id: json.loads(state) for group_id, state in rows}
+
+    def __run(self):
+        connection = self.__connect()
+        written = 0
+        running = True
+        while running:
+            batch = []
+            # 等待写入完成的标记，本批提交后通知
+            waiters = []
+            try:
+                item = self.__queue.get(timeout=self.__flush_interval)
+                # 取出当前积压的所有记录一次提交，直到队列为空或收到结束标记
+                while item is not None:
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    item = self.__queue.get_nowait()
+                running = False
+            except queue.Empty:
+                pass
+
+            if not batch:
+                for waiter in waiters:
+                    waiter.set()
+                continue
+
+            try:
+                connection.executemany(
+                    "INSERT INTO journal (group_id, kind, state) VALUES (?, ?, ?)",
+                    [(group_id, kind, None if state is None else json.dumps(state, ensure_ascii=False))
+                     for group_id, kind, state in batch]
+                )
+                connection.commit()
+                written += len(batch)
+                if written >= self.__compact_every:
+                    self.__compact(connection)
+                    written = 0
+            except sqlite3.Error as e:
+                logger.error(f"写入游戏日志失败: {e}")
+            for waiter in waiters:
+                waiter.set()
+        connection.close()
+
+    @staticmethod
+    def __compact(connection: sqlite3.Connection):
+        # 每个群只保留最新的一条记录，已移除的游戏不再保留
+        connection.execute("""
+            DELETE FROM journal WHERE seq NOT IN (SELECT MAX(seq) FROM journal GROUP BY group_id)
+        """)
+        connection.execute("DELETE FROM journal WHERE state IS NULL")
+        connection.commit()
+
+
+journal = GameJournal(plugin_config.spy_game_journal_path,
+                      plugin_config.spy_game_journal_flush_interval,
+                      plugin_config.spy_game_journal_compact_every)
@@ -0,0 +1,62 @@
+import asyncio
+from inspect import isawaitable
+from collections import deque
+from typing import Any, Callable, Optional
+from nonebot.log import logger
+
+
+class Mailbox:
+    """
+    单局游戏的指令队列。指令按到达顺序逐条执行，上一条执行完（包括其中的 await）后才开始下一条，
+    同一局游戏的指令不会交错执行，不同游戏之间互不等待。
+    队列为空时后台任务退出，空闲的游戏不占用任务。
+    指令中不能再等待同一个队列的指令，否则会互相等待。
+    """
+
+    # 保留弱引用，性能分析期间可以为队列打上标签
+    __slots__ = ("__queue", "__task", "__weakref__")
+
+    def __init__(self):
+        self.__queue: deque[tuple[Callable[..., Any], tuple, Optional[asyncio.Future]]] = deque()
+        self.__task: Optional[asyncio.Task] = None
+
+    def get_depth(self) -> int:
+        return len(self.__queue)
+
+    async def call(self, func: Callable[..., Any], *args) -> Any:
+        """
+        将指令加入队列并等待执行结果，指令抛出的异常会在这里重新抛出。
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.__put(func, args, future)
+        return await future
+
+    def post(self, func: Callable[..., Any], *args):
+        """
+        将指令加入队列，不等待执行结果，用于定时器等同步回调。
+        """
+        self.__put(func, args, None)
+
+    def __put(self, func: Callable[..., Any], args: tuple, future: Optional[asyncio.Future]):
+        self.__queue.append((func, args, future))
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def __run(self):
+        try:
+            while self.__queue:
+                func, args, future = self.__queue.popleft()
+                try:
+                    result = func(*args)
+                    if isawaitable(result):
+                        result = await result
+                except Exception as e:
+                    if future is None:
+                        logger.opt(exception=e).error("游戏指令执行失败")
+                    elif not future.done():
+                        future.set_exception(e)
+                    continue
+                if future is not None and not future.done():
+                    future.set_result(result)
+        finally:
+            self.__task = None
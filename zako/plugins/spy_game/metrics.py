@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+Labels = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """
+    固定分桶的耗时直方图，记录时只做一次二分查找。
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.__buckets = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__sum = 0.0
+        self.__count = 0
+
+    def observe(self, value: float):
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__sum += value
+        self.__count += 1
+
+    def render(self, name: str, labels: Labels) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.__buckets, "+Inf"), self.__counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.__sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.__count}")
+        return lines
+
+
+class Metrics:
+    """
+    插件内的指标集合。记录指标只更新内存中的计数，
+    只有在被抓取时才生成 Prometheus 文本格式，并调用各个 gauge 的采集函数。
+    """
+
+    def __init__(self):
+        self.__counters: dict[str, dict[Labels, float]] = {}
+        self.__histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.__gauges: dict[str, Callable[[], Iterable[tuple[dict[str, object], float]]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.__counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        series = self.__histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+    def result(self, operation: str, code: int) -> int:
+        """
+        记录 Game 方法的返回码并原样返回，便于直接用于 match 语句。
+        """
+        self.inc("spy_game_results_total", operation=operation, code=code)
+        return code
+
+    def add_gauge(self, name: str, collect: Callable[[], Iterable[tuple[dict[str, object], float]]]):
+        self.__gauges[name] = collect
+
+    def render(self) -> str:
+        lines = []
+        for name, series in self.__counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in series.items())
+        for name, series in self.__histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                lines.extend(histogram.render(name, labels))
+        for name, collect in self.__gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(_labels(labels))} {value}" for labels, value in collect())
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = Metrics()
@@ -0,0 +1,20 @@
+from nonebot.adapters.onebot.v11.event import Event, GroupMessageEvent
+
+
+class GameUser:
+    """
+    游戏会话的权限检查。可以在群聊中发言的用户集合由 Game 在玩家加入、退出和出局时增量维护，
+    检查每条消息只需要一次集合查找。私聊投票由路由索引直接交给对应的游戏，不经过会话。
+    """
+
+    __slots__ = ("__group_id", "__group_users")
+
+    def __init__(self, group_id: int, group_users: set[int]):
+        self.__group_id = group_id
+        # 出局的房主仍可以在群聊中结束游戏
+        self.__group_users = group_users
+
+    async def __call__(self, event: Event) -> bool:
+        return isinstance(event, GroupMessageEvent) \
+            and event.group_id == self.__group_id \
+            and event.user_id in self.__group_users
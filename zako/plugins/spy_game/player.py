@@ -1,12 +1,16 @@
+from typing import Optional
 from .status import PlayerStatus
 from .identity import Identity
 
 
 class Player:
+    __slots__ = ("__user_id", "__status", "__identity", "__seat")
+
     def __init__(self, user_id):
         self.__user_id = user_id
         self.__status = PlayerStatus.GAMING
         self.__identity = Identity.CIVILIAN
+        self.__seat: Optional[int] = None
 
     def get_user_id(self):
         return self.__user_id
@@ -17,8 +21,14 @@ class Player:
     def get_identity(self):
         return self.__identity
 
+    def get_seat(self):
+        return self.__seat
+
     def set_status(self, status: PlayerStatus):
         self.__status = status
 
     def set_identity(self, identity: Identity):
         self.__identity = identity
+
+    def set_seat(self, seat: int):
+        self.__seat = seat
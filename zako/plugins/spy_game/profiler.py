@@ -0,0 +1,165 @@
+import os
+import signal
+import asyncio
+import threading
+from heapq import heappush, heappushpop
+from time import strftime
+from typing import Optional
+from weakref import WeakKeyDictionary
+from nonebot.log import logger
+from nonebot.matcher import Matcher
+from .config import plugin_config
+from .mailbox import Mailbox
+
+# 在这些函数的栈帧中查找标签的所有者: 事件响应器的运行函数与游戏指令队列的执行函数
+ANCHORS = {
+    Matcher.run.__code__: "self",
+    Mailbox._Mailbox__run.__code__: "self"
+}
+
+
+class SamplingProfiler:
+    """
+    按需开启的采样分析器。开启期间由 SIGPROF 按 CPU 时间定时中断事件循环所在的主线程，记录当前调用栈，
+    并按调用栈中正在运行的事件响应器或游戏指令队列所属的群和游戏阶段打上标签；同时记录耗时最长的指令和接口调用，用于排查等待而非计算造成的卡顿。
+    结束后将调用栈以 collapsed stack 格式（可直接交给 flamegraph.pl 或 speedscope）与最慢的调用一起写入输出目录。
+    未开启时不安装信号处理函数，各处钩子只做一次布尔判断。
+    """
+
+    def __init__(self, interval: float, output_dir: str, slowest: int):
+        self.__interval = interval
+        self.__output_dir = output_dir
+        self.__slowest = slowest
+        self.__active = False
+        self.__task: Optional[asyncio.Task] = None
+        self.__previous_handler = None
+        # 调用栈 -> 采样次数
+        self.__samples: dict[str, int] = {}
+        # 代码对象 -> 栈帧名称，避免每次采样重新拼接字符串
+        self.__names: dict = {}
+        # 事件响应器或指令队列 -> 标签
+        self.__tags: WeakKeyDictionary[object, str] = WeakKeyDictionary()
+        # 最慢的调用，按耗时组成的小顶堆
+        self.__calls: list[tuple[float, int, str, str]] = []
+        self.__call_total = 0
+
+    def is_active(self) -> bool:
+        return self.__active
+
+    def tag(self, owner: Matcher | Mailbox, group_id: Optional[int], phase: str):
+        """
+        为事件响应器或游戏指令队列打上群号和游戏阶段的标签，调用栈中经过它们的采样都归入这个标签。
+        """
+        self.__tags[owner] = self.__format_tag(group_id, phase)
+
+    def record(self, name: str, duration: float,
+               owner: Optional[Matcher | Mailbox] = None, group_id: Optional[int] = None):
+        """
+        记录一次指令或接口调用的耗时，标签取自 owner 或 group_id。
+        """
+        if owner is not None and owner in self.__tags:
+            tag = self.__tags[owner]
+        elif group_id is not None:
+            tag = self.__format_tag(group_id, "-")
+        else:
+            tag = "loop"
+        self.__call_total += 1
+        item = (duration, self.__call_total, name, tag)
+        if len(self.__calls) < self.__slowest:
+            heappush(self.__calls, item)
+        else:
+            heappushpop(self.__calls, item)
+
+    def start(self, duration: float):
+        # 如果已经在分析中，返回1
+        if self.__active:
+            return 1
+
+        # 如果当前平台不支持 SIGPROF 或不在主线程中，返回2
+        if not hasattr(signal, "SIGPROF") or threading.current_thread() is not threading.main_thread():
+            return 2
+
+        # 成功返回0，到时自动停止并写入结果
+        self.__samples = {}
+        self.__calls = []
+        self.__call_total = 0
+        self.__previous_handler = signal.signal(signal.SIGPROF, self.__sample)
+        signal.setitimer(signal.ITIMER_PROF, self.__interval, self.__interval)
+        self.__active = True
+        self.__task = asyncio.create_task(self.__run(duration))
+        logger.info(f"性能分析已开启，{duration:g} 秒后结束")
+        return 0
+
+    async def wait(self) -> Optional[tuple[str, str]]:
+        """
+        等待当前的分析结束，返回写入的调用栈与最慢调用两个文件的路径。
+        """
+        if self.__task is None:
+            return None
+        return await asyncio.shield(self.__task)
+
+    async def stop(self) -> Optional[tuple[str, str]]:
+        if not self.__active:
+            return None
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.__previous_handler or signal.SIG_DFL)
+        self.__active = False
+        self.__tags.clear()
+
+        samples, self.__samples = self.__samples, {}
+        calls, self.__calls = sorted(self.__calls, reverse=True), []
+        try:
+            paths = await asyncio.to_thread(self.__write, samples, calls)
+        except OSError as e:
+            logger.error(f"写入性能分析结果失败: {e}")
+            return None
+        logger.info(f"性能分析结束，共 {sum(samples.values())} 次采样，结果已写入 {paths[0]}")
+        return paths
+
+    async def close(self):
+        if self.__task is not None and not self.__task.done():
+            self.__task.cancel()
+        await self.stop()
+
+    @staticmethod
+    def __format_tag(group_id: Optional[int], phase: str) -> str:
+        return f"group_{group_id};{phase}" if group_id is not None else f"private;{phase}"
+
+    def __sample(self, _signum, frame):
+        names = self.__names
+        stack = []
+        tag = None
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"
+            stack.append(name)
+            # 使用最内层带有标签的所有者
+            if tag is None and code in ANCHORS:
+                tag = self.__tags.get(frame.f_locals.get(ANCHORS[code]))
+            frame = frame.f_back
+        stack.append(tag or "loop")
+        key = ";".join(reversed(stack))
+        self.__samples[key] = self.__samples.get(key, 0) + 1
+
+    def __write(self, samples: dict[str, int], calls: list[tuple[float, int, str, str]]) -> tuple[str, str]:
+        os.makedirs(self.__output_dir, exist_ok=True)
+        prefix = os.path.join(self.__output_dir, f"spy_game_profile_{strftime('%Y%m%d-%H%M%S')}")
+        with open(f"{prefix}.collapsed", "w", encoding="utf-8") as file:
+            for stack, count in sorted(samples.items(), key=lambda item: item[1], reverse=True):
+                file.write(f"{stack} {count}\n")
+        with open(f"{prefix}.slowest.txt", "w", encoding="utf-8") as file:
+            file.write(f"# 采样间隔 {self.__interval * 1000:g}ms，共记录 {self.__call_total} 次调用，以下为最慢的 {len(calls)} 次\n")
+            for duration, _, name, tag in calls:
+                file.write(f"{duration * 1000:10.2f}ms  {name}  {tag.replace(';', ' ')}\n")
+        return f"{prefix}.collapsed", f"{prefix}.slowest.txt"
+
+    async def __run(self, duration: float) -> Optional[tuple[str, str]]:
+        await asyncio.sleep(duration)
+        return await self.stop()
+
+
+profiler = SamplingProfiler(plugin_config.spy_game_profile_interval,
+                            plugin_config.spy_game_profile_dir,
+                            plugin_config.spy_game_profile_slowest)
@@ -0,0 +1,46 @@
+import asyncio
+from time import monotonic
+
+
+class TokenBucket:
+    """
+    令牌桶限速器，每秒补充 rate 个令牌，最多积累 burst 个。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.__rate = rate
+        self.__burst = burst
+        self.__tokens = float(burst)
+        self.__updated_at = monotonic()
+        self.__lock = asyncio.Lock()
+
+    def get_tokens(self) -> float:
+        self.__fill()
+        return self.__tokens
+
+    def try_acquire(self) -> bool:
+        # 有令牌时立即取走，没有时不等待
+        self.__fill()
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        return True
+
+    def get_delay(self) -> float:
+        # 距离下一个令牌补充完成的时间
+        self.__fill()
+        return max(0.0, (1 - self.__tokens) / self.__rate)
+
+    async def acquire(self):
+        # 加锁保证等待中的调用方按顺序获得令牌
+        async with self.__lock:
+            self.__fill()
+            if self.__tokens < 1:
+                await asyncio.sleep((1 - self.__tokens) / self.__rate)
+                self.__fill()
+            self.__tokens -= 1
+
+    def __fill(self):
+        now = monotonic()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated_at) * self.__rate)
+        self.__updated_at = now
@@ -0,0 +1,154 @@
+import asyncio
+from time import monotonic
+from typing import Callable, ItemsView, Optional, ValuesView
+from collections import OrderedDict
+from nonebot.log import logger
+from .game import Game
+from .config import plugin_config
+from .status import GameStatus
+
+
+class GameRegistry:
+    """
+    按群号保存进行中的游戏。记录每局游戏的最后活跃时间，
+    由后台任务定期清理长时间无人操作的游戏，并限制同时存在的游戏数量。
+    """
+
+    def __init__(self, max_games: int, waiting_timeout: float, playing_timeout: float, sweep_interval: float):
+        self.__max_games = max_games
+        self.__waiting_timeout = waiting_timeout
+        self.__playing_timeout = playing_timeout
+        self.__sweep_interval = sweep_interval
+        # 按最后活跃时间从旧到新排列
+        self.__games: OrderedDict[int, Game] = OrderedDict()
+        self.__active_at: dict[int, float] = {}
+        self.__on_evict: Optional[Callable[[int, Game], None]] = None
+        self.__on_remove: Optional[Callable[[int, Game], None]] = None
+        self.__task: Optional[asyncio.Task] = None
+        self.__created = 0
+        self.__removed = 0
+        self.__evicted = 0
+
+    def get(self, group_id) -> Optional[Game]:
+        return self.__games.get(group_id)
+
+    def add(self, group_id, game: Game):
+        # 如果该群已经存在游戏，返回1
+        if group_id in self.__games:
+            return 1
+
+        # 如果游戏数量达到上限，返回2
+        if len(self.__games) >= self.__max_games:
+            return 2
+
+        # 成功返回0
+        self.__games[group_id] = game
+        self.__active_at[group_id] = monotonic()
+        self.__created += 1
+        return 0
+
+    def remove(self, group_id, game: Optional[Game] = None) -> Optional[Game]:
+        # 指定 game 时只移除同一局游戏，避免误删该群新创建的游戏
+        if game is not None and self.__games.get(group_id) is not game:
+            return None
+
+        removed = self.__games.pop(group_id, None)
+        if removed is not None:
+            del self.__active_at[group_id]
+            self.__removed += 1
+            if self.__on_remove is not None:
+                self.__on_remove(group_id, removed)
+        return removed
+
+    def get_games(self) -> ValuesView[Game]:
+        return self.__games.values()
+
+    def get_items(self) -> ItemsView[int, Game]:
+        return self.__games.items()
+
+    def touch(self, group_id):
+        if group_id in self.__games:
+            self.__games.move_to_end(group_id)
+            self.__active_at[group_id] = monotonic()
+
+    def get_live_total(self) -> int:
+        return len(self.__games)
+
+    def get_created_total(self) -> int:
+        return self.__created
+
+    def get_removed_total(self) -> int:
+        return self.__removed
+
+    def get_evicted_total(self) -> int:
+        return self.__evicted
+
+    def set_on_evict(self, on_evict: Callable[[int, Game], None]):
+        self.__on_evict = on_evict
+
+    def set_on_remove(self, on_remove: Callable[[int, Game], None]):
+        self.__on_remove = on_remove
+
+    def sweep(self) -> int:
+        now = monotonic()
+        min_timeout = min(self.__waiting_timeout, self.__playing_timeout)
+        expired = []
+
+        # 从最久未活跃的游戏开始检查，遇到未超过最短超时时间的游戏即可停止
+        for group_id, game in self.__games.items():
+            if now - self.__active_at[group_id] < min_timeout:
+                break
+            if self.__is_expired(group_id, game, now):
+                expired.append((group_id, game))
+
+        # 清理在游戏的信箱中执行，与该局正在处理的指令按顺序进行
+        for group_id, game in expired:
+            game.post(self.__evict, group_id, game)
+
+        return len(expired)
+
+    def __is_expired(self, group_id, game: Game, now: float) -> bool:
+        if game.get_status() in (GameStatus.DISCUSSING, GameStatus.VOTING):
+            timeout = self.__playing_timeout
+        else:
+            timeout = self.__waiting_timeout
+        return now - self.__active_at[group_id] >= timeout
+
+    def __evict(self, group_id, game: Game):
+        # 排队期间游戏可能已被移除，或者重新有了操作、进入了超时时间不同的阶段
+        if self.__games.get(group_id) is not game or not self.__is_expired(group_id, game, monotonic()):
+            return
+
+        del self.__games[group_id]
+        del self.__active_at[group_id]
+        self.__evicted += 1
+        if self.__on_evict is not None:
+            self.__on_evict(group_id, game)
+        if self.__on_remove is not None:
+            self.__on_remove(group_id, game)
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.__sweep_interval)
+            try:
+                evicted = self.sweep()
+            except Exception as e:
+                logger.opt(exception=e).error("清理游戏失败")
+                continue
+            if evicted:
+                logger.info(f"清理 {evicted} 局长时间无人操作的游戏")
+
+
+registry = GameRegistry(plugin_config.spy_game_max_games,
+                        plugin_config.spy_game_waiting_timeout,
+                        plugin_config.spy_game_playing_timeout,
+                        plugin_config.spy_game_sweep_interval)
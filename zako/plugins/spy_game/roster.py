@@ -0,0 +1,67 @@
+from nonebot.adapters.onebot.v11.bot import Bot
+from .game import Game
+from .status import GameStatus
+from .config import plugin_config
+from .scheduler import scheduler
+from .timers import timer_wheel, TimerHandle
+
+
+class RosterAnnouncer:
+    """
+    玩家名单公告。合并一段时间内的加入和退出，到时只向群聊发送一次最新的名单，
+    避免多人连续加入时刷屏并占用发送额度。
+    """
+
+    def __init__(self, delay: float):
+        self.__delay = delay
+        # 群号 -> (游戏, 新加入的玩家, 退出的玩家, 定时器)
+        self.__pending: dict[int, tuple[Game, list[int], list[int], TimerHandle]] = {}
+
+    def add(self, bot: Bot, group_id: int, game: Game, user_id: int, joined: bool):
+        if not self.__delay:
+            self.__send(bot, group_id, game, [user_id] if joined else [], [] if joined else [user_id])
+            return
+
+        pending = self.__pending.get(group_id)
+        if pending is None or pending[0] is not game:
+            self.discard(group_id)
+            handle = timer_wheel.call_later(self.__delay, lambda: self.flush(bot, group_id))
+            pending = self.__pending[group_id] = (game, [], [], handle)
+
+        # 同一个玩家在等待期间先加入后退出（或相反）时互相抵消
+        _, joined_users, left_users, _ = pending
+        added, removed = (joined_users, left_users) if joined else (left_users, joined_users)
+        if user_id in removed:
+            removed.remove(user_id)
+        else:
+            added.append(user_id)
+
+    def flush(self, bot: Bot, group_id: int):
+        pending = self.__pending.pop(group_id, None)
+        if pending is None:
+            return
+        game, joined_users, left_users, handle = pending
+        # 提前公布时取消定时器，避免它之后提前公布新的一批变化
+        handle.cancel()
+        self.__send(bot, group_id, game, joined_users, left_users)
+
+    def discard(self, group_id: int):
+        pending = self.__pending.pop(group_id, None)
+        if pending is not None:
+            pending[3].cancel()
+
+    @staticmethod
+    def __send(bot: Bot, group_id: int, game: Game, joined_users: list[int], left_users: list[int]):
+        # 游戏已经开始后不再公布名单
+        if game.get_status() != GameStatus.WAITING or (not joined_users and not left_users):
+            return
+
+        message = ""
+        if joined_users:
+            message += "新加入: " + "、".join(map(str, joined_users)) + "\n"
+        if left_users:
+            message += "已退出: " + "、".join(map(str, left_users)) + "\n"
+        scheduler.send_group_msg(bot, group_id, message + game.get_roster())
+
+
+roster_announcer = RosterAnnouncer(plugin_config.spy_game_roster_delay)
@@ -0,0 +1,47 @@
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from .game import Game
+
+
+class GameRouter:
+    """
+    user_id 到所在游戏的路由索引，随玩家加入、退出、出局以及游戏移除增量更新。
+    私聊消息据此直接交给对应的游戏处理，不需要逐个检查所有游戏会话的权限。
+    每个用户同时只能参与一局游戏，因此路由不会有歧义。
+    """
+
+    def __init__(self):
+        # user_id -> (群号, 游戏)
+        self.__routes: dict[int, tuple[int, "Game"]] = {}
+        # 路由变化时的回调，分片部署时用于通知前端转发私聊
+        self.__on_change: Optional[Callable[[int, bool], None]] = None
+
+    def get(self, user_id) -> Optional[tuple[int, "Game"]]:
+        return self.__routes.get(user_id)
+
+    def get_total(self) -> int:
+        return len(self.__routes)
+
+    def set_on_change(self, on_change: Optional[Callable[[int, bool], None]]):
+        self.__on_change = on_change
+
+    def bind(self, user_id, group_id, game: "Game"):
+        self.__routes[user_id] = (group_id, game)
+        if self.__on_change is not None:
+            self.__on_change(user_id, True)
+
+    def unbind(self, user_id, game: "Game"):
+        # 只移除指向同一局游戏的路由，避免误删用户在其他游戏中的路由
+        route = self.__routes.get(user_id)
+        if route is not None and route[1] is game:
+            del self.__routes[user_id]
+            if self.__on_change is not None:
+                self.__on_change(user_id, False)
+
+    def unbind_game(self, game: "Game"):
+        for player in game.get_joined_players():
+            self.unbind(player.get_user_id(), game)
+
+
+router = GameRouter()
@@ -0,0 +1,207 @@
+import asyncio
+from enum import Enum, unique
+from time import monotonic
+from typing import Any, Optional, Union
+from collections import deque
+from nonebot.log import logger
+from nonebot.adapters.onebot.v11.bot import Bot
+from nonebot.adapters.onebot.v11.message import Message
+from .config import plugin_config
+from .ratelimit import TokenBucket
+from .stats import LatencyStats
+from .metrics import metrics
+
+QueueKey = tuple[str, int]
+
+
+@unique
+class Priority(Enum):
+    """
+    用于描述消息优先级的枚举类，数值越小越先发送。
+    """
+    CRITICAL = 0
+    INFO = 1
+
+
+class Outbound:
+    __slots__ = ("bot", "api", "data", "priority", "future", "enqueued_at")
+
+    def __init__(self, bot: Bot, api: str, data: dict[str, Any], priority: Priority):
+        self.bot = bot
+        self.api = api
+        self.data = data
+        self.priority = priority
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = monotonic()
+
+    def resolve(self, success: bool):
+        # 调用方可能已经取消了等待
+        if not self.future.done():
+            self.future.set_result(success)
+
+
+class MessageScheduler:
+    """
+    统一的消息发送调度器。每个群（或私聊对象）一个队列，同一队列内的消息按顺序逐条发送，
+    不同队列之间轮流发送，重要消息优先于普通消息，每个机器人账号一个令牌桶限速，限速中的账号不影响其他账号的消息。
+    普通消息在队列过长时丢弃最旧的一条，重要消息不会被丢弃。
+    """
+
+    def __init__(self, rate: float, burst: int, concurrency: int, queue_size: int):
+        self.__rate = rate
+        self.__burst = burst
+        self.__buckets: dict[str, TokenBucket] = {}
+        self.__semaphore = asyncio.Semaphore(concurrency)
+        self.__queue_size = queue_size
+        self.__queues: dict[QueueKey, tuple[deque[Outbound], ...]] = {}
+        self.__ready: tuple[deque[QueueKey], ...] = tuple(deque() for _ in Priority)
+        self.__busy: set[QueueKey] = set()
+        self.__wakeup = asyncio.Event()
+        self.__task: Optional[asyncio.Task] = None
+        self.__wait = LatencyStats()
+        self.__depth = 0
+        self.__enqueued = 0
+        self.__sent = 0
+        self.__failed = 0
+        self.__dropped = 0
+
+    def send_group_msg(self, bot: Bot, group_id: int, message: Union[str, Message],
+                       priority: Priority = Priority.INFO) -> asyncio.Future:
+        return self.__enqueue(("group", group_id), Outbound(bot, "send_group_msg", {
+            "group_id": group_id,
+            "message": message
+        }, priority))
+
+    def send_private_msg(self, bot: Bot, user_id: int, message: Union[str, Message],
+                         priority: Priority = Priority.INFO) -> asyncio.Future:
+        # 每个私聊对象一个队列，只需保证发给同一玩家的消息顺序，开局发词时各玩家的私聊可以同时发送
+        return self.__enqueue(("private", user_id), Outbound(bot, "send_private_msg", {
+            "user_id": user_id,
+            "message": message
+        }, priority))
+
+    def get_depth(self, group_id: Optional[int] = None) -> int:
+        if group_id is None:
+            return self.__depth
+        queues = self.__queues.get(("group", group_id))
+        return sum(len(queue) for queue in queues) if queues else 0
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            "depth": self.__depth,
+            "queues": len(self.__queues),
+            "enqueued": self.__enqueued,
+            "sent": self.__sent,
+            "failed": self.__failed,
+            "dropped": self.__dropped,
+            "wait": self.__wait
+        }
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    def __enqueue(self, key: QueueKey, item: Outbound) -> asyncio.Future:
+        queues = self.__queues.get(key)
+        if queues is None:
+            queues = self.__queues[key] = tuple(deque() for _ in Priority)
+
+        queue = queues[item.priority.value]
+        if item.priority == Priority.INFO and len(queue) >= self.__queue_size:
+            dropped = queue.popleft()
+            dropped.resolve(False)
+            self.__depth -= 1
+            self.__dropped += 1
+
+        if not queue and key not in self.__busy:
+            self.__ready[item.priority.value].append(key)
+        queue.append(item)
+        self.__depth += 1
+        self.__enqueued += 1
+        self.__wakeup.set()
+        return item.future
+
+    def __get_bucket(self, bot: Bot) -> TokenBucket:
+        bucket = self.__buckets.get(bot.self_id)
+        if bucket is None:
+            bucket = self.__buckets[bot.self_id] = TokenBucket(self.__rate, self.__burst)
+        return bucket
+
+    def __pop(self) -> tuple[Optional[tuple[QueueKey, Outbound]], Optional[float]]:
+        """
+        取出下一条可以发送的消息。所用账号没有令牌的队列留在待发送列表中，不阻塞其他账号的消息；
+        没有可发送的消息时同时返回最早有账号补充令牌的等待时间。
+        """
+        delay = None
+        for priority in Priority:
+            ready = self.__ready[priority.value]
+            for _ in range(len(ready)):
+                key = ready.popleft()
+                queues = self.__queues.get(key)
+                # 跳过正在发送或已经清空的队列，发送完成后会重新加入待发送列表
+                if key in self.__busy or not queues or not queues[priority.value]:
+                    continue
+                bucket = self.__get_bucket(queues[priority.value][0].bot)
+                if not bucket.try_acquire():
+                    ready.append(key)
+                    delay = bucket.get_delay() if delay is None else min(delay, bucket.get_delay())
+                    continue
+                item = queues[priority.value].popleft()
+                self.__depth -= 1
+                self.__busy.add(key)
+                return (key, item), None
+        return None, delay
+
+    def __release(self, key: QueueKey):
+        # 队列中的消息发送完成后，才将该队列重新放回待发送列表
+        self.__busy.discard(key)
+        queues = self.__queues[key]
+        for priority in Priority:
+            if queues[priority.value]:
+                self.__ready[priority.value].append(key)
+        if not any(queues):
+            del self.__queues[key]
+        self.__wakeup.set()
+
+    async def __run(self):
+        while True:
+            popped, delay = self.__pop()
+            if popped is None:
+                # 等待新消息、发送完成或限速中的账号补充令牌
+                self.__wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.__wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.__semaphore.acquire()
+            asyncio.create_task(self.__deliver(*popped))
+
+    async def __deliver(self, key: QueueKey, item: Outbound):
+        wait = monotonic() - item.enqueued_at
+        self.__wait.record(wait)
+        metrics.observe("spy_game_send_wait_seconds", wait, priority=item.priority.name)
+        try:
+            await item.bot.call_api(item.api, **item.data)
+        except Exception as e:
+            logger.warning(f"消息发送失败 {item.api} {key}: {e}")
+            self.__failed += 1
+            item.resolve(False)
+        else:
+            self.__sent += 1
+            item.resolve(True)
+        finally:
+            self.__semaphore.release()
+            self.__release(key)
+
+
+scheduler = MessageScheduler(plugin_config.spy_game_send_rate,
+                             plugin_config.spy_game_send_burst,
+                             plugin_config.spy_game_send_concurrency,
+                             plugin_config.spy_game_send_queue_size)
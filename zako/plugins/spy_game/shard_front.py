@@ -0,0 +1,239 @@
+import os
+import sys
+import asyncio
+from collections import deque
+from pathlib import Path
+from typing import Any, Optional
+from nonebot import get_bot, get_bots
+from nonebot.log import logger
+from nonebot.compat import model_dump
+from nonebot.adapters.onebot.v11.bot import Bot
+from nonebot.adapters.onebot.v11.event import Event, GroupMessageEvent, PrivateMessageEvent, NoticeEvent
+from .config import plugin_config
+from .ratelimit import TokenBucket
+from .sharding import get_owner, read_frame, write_frame
+
+# 工作进程的启动脚本
+WORKER_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "shard_worker.py"
+# 由前端统一限速的发送消息接口
+SEND_APIS = {"send_msg", "send_group_msg", "send_private_msg"}
+
+
+class ShardFront:
+    """
+    分片部署的前端。只负责接收 OneBot 事件并转发给工作进程，本身不保存任何游戏:
+    群消息按群号的哈希转发给所属的工作进程，私聊按工作进程上报的玩家路由转发，好友通知广播给所有工作进程；
+    工作进程的接口调用由前端代为调用真实的机器人，发送消息按账号统一限速，多个工作进程合计不超过单个账号的发送速率。
+    工作进程连接或断开时重新分配群: 先通知所有工作进程交出不再属于自己的游戏并写入共享的游戏日志，
+    再通知它们从日志中接管新分配的游戏，分配期间收到的事件暂存，分配完成后按顺序转发。
+    """
+
+    def __init__(self, shard_total: int, socket_path: str, spawn: bool, buffer_size: int,
+                 send_rate: float, send_burst: int):
+        self.__shard_total = shard_total
+        self.__socket_path = socket_path
+        self.__spawn = spawn
+        self.__buffer_size = buffer_size
+        self.__server: Optional[asyncio.AbstractServer] = None
+        # 工作进程编号 -> 连接
+        self.__workers: dict[int, asyncio.StreamWriter] = {}
+        # 当前参与分配的工作进程编号
+        self.__alive: tuple[int, ...] = ()
+        # user_id -> 工作进程编号，用于转发私聊投票
+        self.__routes: dict[int, int] = {}
+        self.__buffer: deque[tuple[Optional[int], Optional[int], dict[str, Any]]] = deque()
+        self.__rebalance_lock = asyncio.Lock()
+        self.__rebalancing = False
+        self.__released: dict[int, asyncio.Future] = {}
+        self.__processes: list[asyncio.Task] = []
+        self.__stopping = False
+        self.__send_rate = send_rate
+        self.__send_burst = send_burst
+        self.__buckets: dict[str, TokenBucket] = {}
+
+    def get_alive(self) -> tuple[int, ...]:
+        return self.__alive
+
+    def get_route_total(self) -> int:
+        return len(self.__routes)
+
+    async def start(self):
+        if os.path.exists(self.__socket_path):
+            os.remove(self.__socket_path)
+        if os.path.dirname(self.__socket_path):
+            os.makedirs(os.path.dirname(self.__socket_path), exist_ok=True)
+        self.__server = await asyncio.start_unix_server(self.__on_connect, self.__socket_path)
+        if self.__spawn:
+            self.__processes = [asyncio.create_task(self.__supervise(index)) for index in range(self.__shard_total)]
+        logger.info(f"分片前端已启动，共 {self.__shard_total} 个工作进程")
+
+    async def stop(self):
+        self.__stopping = True
+        for task in self.__processes:
+            task.cancel()
+        await asyncio.gather(*self.__processes, return_exceptions=True)
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+    def forward(self, bot: Bot, event: Event) -> bool:
+        """
+        转发事件，返回是否已交给工作进程。
+        """
+        group_id = user_id = None
+        if isinstance(event, GroupMessageEvent):
+            group_id = event.group_id
+        elif isinstance(event, PrivateMessageEvent):
+            user_id = event.user_id
+            if user_id not in self.__routes:
+                return False
+        elif not isinstance(event, NoticeEvent) or event.notice_type not in ("friend_add", "friend_delete"):
+            return False
+
+        data = {"type": "event", "self_id": bot.self_id, "event": model_dump(event)}
+        if self.__rebalancing or not self.__alive:
+            if len(self.__buffer) >= self.__buffer_size:
+                self.__buffer.popleft()
+                logger.warning("分片重新分配期间暂存的事件过多，已丢弃最早的事件")
+            self.__buffer.append((group_id, user_id, data))
+            return True
+        self.__send(group_id, user_id, data)
+        return True
+
+    def on_bot_connect(self, bot: Bot):
+        self.__broadcast({"type": "connect", "self_id": bot.self_id})
+
+    def on_bot_disconnect(self, bot: Bot):
+        self.__broadcast({"type": "disconnect", "self_id": bot.self_id})
+
+    def __send(self, group_id: Optional[int], user_id: Optional[int], data: dict[str, Any]):
+        # 群消息发给所属的工作进程，私聊发给玩家所在游戏的工作进程，其余事件广播
+        if group_id is not None:
+            index = get_owner(group_id, self.__alive)
+        elif user_id is not None:
+            index = self.__routes.get(user_id)
+        else:
+            self.__broadcast(data)
+            return
+        self.__send_to(index, data)
+
+    def __send_to(self, index: Optional[int], data: dict[str, Any]):
+        writer = self.__workers.get(index)
+        if writer is not None:
+            write_frame(writer, data)
+
+    def __broadcast(self, data: dict[str, Any]):
+        for writer in self.__workers.values():
+            write_frame(writer, data)
+
+    async def __on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        hello = await read_frame(reader)
+        if hello is None or hello.get("type") != "hello":
+            writer.close()
+            return
+
+        index = hello["index"]
+        previous = self.__workers.get(index)
+        if previous is not None:
+            previous.close()
+        self.__workers[index] = writer
+        write_frame(writer, {"type": "bots", "self_ids": list(get_bots().keys())})
+        logger.info(f"工作进程 {index} 已连接")
+        asyncio.create_task(self.__rebalance())
+
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                match frame["type"]:
+                    case "call":
+                        asyncio.create_task(self.__call(writer, frame))
+                    case "route":
+                        self.__on_route(index, frame["user_id"], frame["bound"])
+                    case "released":
+                        future = self.__released.get(index)
+                        if future is not None and not future.done():
+                            future.set_result(None)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"工作进程 {index} 的连接出错: {e}")
+        finally:
+            if self.__workers.get(index) is writer:
+                del self.__workers[index]
+                self.__routes = {user_id: owner for user_id, owner in self.__routes.items() if owner != index}
+                logger.warning(f"工作进程 {index} 已断开")
+                if not self.__stopping:
+                    asyncio.create_task(self.__rebalance())
+            writer.close()
+
+    def __on_route(self, index: int, user_id: int, bound: bool):
+        if bound:
+            self.__routes[user_id] = index
+        elif self.__routes.get(user_id) == index:
+            del self.__routes[user_id]
+
+    async def __call(self, writer: asyncio.StreamWriter, frame: dict[str, Any]):
+        response = {"type": "result", "id": frame["id"]}
+        try:
+            bot = get_bot(frame["self_id"])
+            if frame["api"] in SEND_APIS:
+                await self.__get_bucket(bot.self_id).acquire()
+            response["result"] = await bot.call_api(frame["api"], **frame["data"])
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        if not writer.is_closing():
+            write_frame(writer, response)
+
+    def __get_bucket(self, self_id: str) -> TokenBucket:
+        bucket = self.__buckets.get(self_id)
+        if bucket is None:
+            bucket = self.__buckets[self_id] = TokenBucket(self.__send_rate, self.__send_burst)
+        return bucket
+
+    async def __rebalance(self):
+        async with self.__rebalance_lock:
+            alive = tuple(sorted(self.__workers))
+            if alive == self.__alive:
+                return
+
+            self.__rebalancing = True
+            try:
+                # 第一步: 所有工作进程交出不再属于自己的游戏，并等待游戏日志写入完成
+                self.__released = {index: asyncio.get_running_loop().create_future() for index in alive}
+                for index in alive:
+                    self.__send_to(index, {"type": "release", "alive": alive})
+                done, pending = await asyncio.wait(self.__released.values(), timeout=10)
+                if pending:
+                    logger.warning(f"{len(pending)} 个工作进程未在时限内交出游戏")
+
+                # 第二步: 按新的分配接管游戏，之后转发暂存的事件
+                for index in alive:
+                    self.__send_to(index, {"type": "adopt", "alive": alive})
+                self.__alive = alive
+                logger.info(f"分片已重新分配，当前工作进程: {list(alive)}")
+            finally:
+                self.__rebalancing = False
+
+            if self.__alive:
+                while self.__buffer:
+                    self.__send(*self.__buffer.popleft())
+
+    async def __supervise(self, index: int):
+        # 工作进程退出后等待片刻重新启动，重启期间它的群由其他工作进程接管
+        while True:
+            process = await asyncio.create_subprocess_exec(sys.executable, str(WORKER_SCRIPT), str(index),
+                                                           cwd=str(WORKER_SCRIPT.parents[1]))
+            try:
+                code = await process.wait()
+            except asyncio.CancelledError:
+                process.terminate()
+                await process.wait()
+                raise
+            logger.warning(f"工作进程 {index} 已退出（{code}），{plugin_config.spy_game_shard_restart_delay:g} 秒后重启")
+            await asyncio.sleep(plugin_config.spy_game_shard_restart_delay)
+
+
+shard_front = ShardFront(plugin_config.spy_game_shard_total,
+                         plugin_config.spy_game_shard_socket_path,
+                         plugin_config.spy_game_shard_spawn,
+                         plugin_config.spy_game_shard_buffer_size,
+                         plugin_config.spy_game_send_rate,
+                         plugin_config.spy_game_send_burst)
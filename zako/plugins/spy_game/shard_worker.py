@@ -0,0 +1,170 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+from nonebot import get_driver
+from nonebot.log import logger
+from nonebot.message import handle_event
+from nonebot.adapters.onebot.v11 import Adapter
+from nonebot.adapters.onebot.v11.bot import Bot
+from nonebot.adapters.onebot.v11.exception import NetworkError
+from .config import plugin_config
+from .sharding import read_frame, write_frame
+
+
+class ShardAdapter(Adapter):
+    """
+    工作进程使用的适配器。不连接 OneBot 实现，接口调用通过前端代为完成。
+    """
+
+    def _setup(self):
+        pass
+
+    async def _call_api(self, bot: Bot, api: str, **data: Any) -> Any:
+        timeout = data.pop("_timeout", self.config.api_timeout)
+        return await shard_worker.call(bot.self_id, api, data, timeout)
+
+
+class ShardWorker:
+    """
+    分片部署的工作进程与前端之间的连接。接收前端转发的事件交给 NoneBot 处理，
+    代理接口调用，并上报私聊路由的变化；连接断开后自动重连。
+    重新分配时依次调用 on_release 与 on_adopt 交出和接管游戏，参数为当前参与分配的工作进程编号；
+    连接断开后以空的编号调用 on_release 交出全部游戏。
+    """
+
+    def __init__(self, index: int, socket_path: str):
+        self.__index = index
+        self.__socket_path = socket_path
+        self.__writer: Optional[asyncio.StreamWriter] = None
+        self.__task: Optional[asyncio.Task] = None
+        self.__calls: dict[int, asyncio.Future] = {}
+        self.__call_seq = 0
+        self.__on_release: Optional[Callable[[tuple[int, ...]], Awaitable[None]]] = None
+        self.__on_adopt: Optional[Callable[[tuple[int, ...]], Awaitable[None]]] = None
+
+    def get_index(self) -> int:
+        return self.__index
+
+    def set_on_release(self, on_release: Callable[[tuple[int, ...]], Awaitable[None]]):
+        self.__on_release = on_release
+
+    def set_on_adopt(self, on_adopt: Callable[[tuple[int, ...]], Awaitable[None]]):
+        self.__on_adopt = on_adopt
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+
+    def send_route(self, user_id: int, bound: bool):
+        if self.__writer is not None:
+            write_frame(self.__writer, {"type": "route", "user_id": user_id, "bound": bound})
+
+    async def call(self, self_id: str, api: str, data: dict[str, Any], timeout: Optional[float]) -> Any:
+        if self.__writer is None:
+            raise NetworkError("与分片前端的连接已断开")
+        self.__call_seq += 1
+        call_id = self.__call_seq
+        future = self.__calls[call_id] = asyncio.get_running_loop().create_future()
+        write_frame(self.__writer, {"type": "call", "id": call_id, "self_id": self_id, "api": api, "data": data})
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise NetworkError(f"调用接口 {api} 超时")
+        finally:
+            self.__calls.pop(call_id, None)
+
+    async def __run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.__socket_path)
+            except OSError:
+                await asyncio.sleep(1)
+                continue
+
+            self.__writer = writer
+            write_frame(writer, {"type": "hello", "index": self.__index})
+            logger.info(f"工作进程 {self.__index} 已连接到分片前端")
+            try:
+                while (frame := await read_frame(reader)) is not None:
+                    self.__on_frame(frame)
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"与分片前端的连接出错: {e}")
+            finally:
+                self.__writer = None
+                writer.close()
+                for future in self.__calls.values():
+                    if not future.done():
+                        future.set_exception(NetworkError("与分片前端的连接已断开"))
+                self.__disconnect_all()
+            logger.warning("与分片前端的连接已断开，正在重连")
+            # 断开期间前端会把这些群分配给其他工作进程，先交出全部游戏，重连后按重新分配的结果接管
+            if self.__on_release is not None:
+                try:
+                    await self.__on_release(())
+                except Exception as e:
+                    logger.opt(exception=e).error("交出游戏失败")
+            await asyncio.sleep(1)
+
+    def __on_frame(self, frame: dict[str, Any]):
+        match frame["type"]:
+            case "bots":
+                self.__disconnect_all()
+                for self_id in frame["self_ids"]:
+                    self.__connect(self_id)
+            case "connect":
+                self.__connect(frame["self_id"])
+            case "disconnect":
+                self.__disconnect(frame["self_id"])
+            case "event":
+                self.__handle_event(frame["self_id"], frame["event"])
+            case "result":
+                future = self.__calls.get(frame["id"])
+                if future is not None and not future.done():
+                    if "error" in frame:
+                        future.set_exception(NetworkError(frame["error"]))
+                    else:
+                        future.set_result(frame.get("result"))
+            case "release":
+                asyncio.create_task(self.__release(tuple(frame["alive"])))
+            case "adopt":
+                if self.__on_adopt is not None:
+                    asyncio.create_task(self.__on_adopt(tuple(frame["alive"])))
+
+    def __handle_event(self, self_id: str, data: dict[str, Any]):
+        bot = adapter.bots.get(self_id)
+        event = Adapter.json_to_event(data)
+        if bot is None or event is None:
+            return
+        asyncio.create_task(handle_event(bot, event))
+
+    async def __release(self, alive: tuple[int, ...]):
+        try:
+            if self.__on_release is not None:
+                await self.__on_release(alive)
+        finally:
+            if self.__writer is not None:
+                write_frame(self.__writer, {"type": "released"})
+
+    @staticmethod
+    def __connect(self_id: str):
+        if self_id not in adapter.bots:
+            adapter.bot_connect(Bot(adapter, self_id))
+
+    @staticmethod
+    def __disconnect(self_id: str):
+        bot = adapter.bots.get(self_id)
+        if bot is not None:
+            adapter.bot_disconnect(bot)
+
+    def __disconnect_all(self):
+        for self_id in list(adapter.bots):
+            self.__disconnect(self_id)
+
+
+adapter = ShardAdapter(get_driver())
+shard_worker = ShardWorker(plugin_config.spy_game_shard_index, plugin_config.spy_game_shard_socket_path)
@@ -0,0 +1,45 @@
+import json
+import asyncio
+from struct import Struct
+from hashlib import blake2b
+from typing import Any, Iterable, Optional
+from nonebot.utils import DataclassEncoder
+
+# 每帧以 4 字节长度开头，后接 UTF-8 编码的 JSON
+FRAME_HEADER = Struct("<I")
+# 单帧的最大长度，超出时视为连接出错
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+def get_owner(group_id: int, alive: Iterable[int]) -> Optional[int]:
+    """
+    使用最高随机权重（rendezvous）哈希确定群所属的工作进程。
+    工作进程增减时只有原本属于该进程的群需要迁移，其他群的归属不变。
+    """
+    owner = None
+    owner_weight = b""
+    for index in alive:
+        weight = blake2b(f"{group_id}:{index}".encode(), digest_size=8).digest()
+        if owner is None or weight > owner_weight:
+            owner, owner_weight = index, weight
+    return owner
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict[str, Any]]:
+    """
+    读取一帧，连接关闭时返回 None。
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        size, = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise ValueError(f"帧长度 {size} 超出上限")
+        return json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def write_frame(writer: asyncio.StreamWriter, data: dict[str, Any]):
+    # 消息段等数据类按 OneBot 的格式编码
+    payload = json.dumps(data, ensure_ascii=False, cls=DataclassEncoder).encode()
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
@@ -0,0 +1,33 @@
+from collections import deque
+
+
+class LatencyStats:
+    """
+    记录最近一段时间的耗时样本（秒），用于计算分位数。
+    """
+
+    def __init__(self, window: int = 1024):
+        self.__samples: deque[float] = deque(maxlen=window)
+        self.__count = 0
+        self.__total = 0.0
+
+    def record(self, seconds: float):
+        self.__samples.append(seconds)
+        self.__count += 1
+        self.__total += seconds
+
+    def get_count(self) -> int:
+        return self.__count
+
+    def get_total(self) -> float:
+        return self.__total
+
+    def percentile(self, p: float) -> float:
+        if not self.__samples:
+            return 0.0
+        samples = sorted(self.__samples)
+        index = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[index]
+
+    def __str__(self):
+        return f"count={self.__count} p50={self.percentile(50) * 1000:.1f}ms p99={self.percentile(99) * 1000:.1f}ms"
@@ -0,0 +1,120 @@
+import asyncio
+from math import ceil
+from typing import Callable, Optional
+from nonebot.log import logger
+from .config import plugin_config
+
+
+class TimerHandle:
+    """
+    时间轮中的一个定时器，可以在触发前取消。
+    """
+
+    __slots__ = ("__callback", "__rounds", "__cancelled", "__wheel")
+
+    def __init__(self, wheel: "TimerWheel", callback: Callable[[], None], rounds: int):
+        self.__wheel = wheel
+        self.__callback = callback
+        # 还需要转过几圈才触发
+        self.__rounds = rounds
+        self.__cancelled = False
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def cancel(self):
+        if not self.__cancelled:
+            self.__cancelled = True
+            self.__wheel.discard()
+
+    def tick(self) -> bool:
+        """
+        指针经过所在的槽时调用，返回 True 表示已经到期。
+        """
+        if self.__rounds > 0:
+            self.__rounds -= 1
+            return False
+        return True
+
+    def fire(self):
+        self.__cancelled = True
+        self.__callback()
+
+
+class TimerWheel:
+    """
+    哈希时间轮。所有定时器按到期的刻度放入环形的槽中，由一个后台任务每个刻度推进一次指针，
+    只检查指针所在的槽，添加和取消定时器都是 O(1)，大量游戏的阶段截止时间共用同一个任务。
+    定时器的精度为一个刻度。
+    """
+
+    def __init__(self, tick: float, slot_total: int = 512):
+        self.__tick = tick
+        self.__slots: list[list[TimerHandle]] = [[] for _ in range(slot_total)]
+        self.__cursor = 0
+        self.__pending = 0
+        self.__task: Optional[asyncio.Task] = None
+
+    def get_pending(self) -> int:
+        return self.__pending
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        slot_total = len(self.__slots)
+        ticks = max(ceil(delay / self.__tick), 1)
+        handle = TimerHandle(self, callback, (ticks - 1) // slot_total)
+        self.__slots[(self.__cursor + ticks) % slot_total].append(handle)
+        self.__pending += 1
+        return handle
+
+    def discard(self):
+        # 取消的定时器在指针经过时才从槽中移除
+        self.__pending -= 1
+
+    def advance(self):
+        self.__cursor = (self.__cursor + 1) % len(self.__slots)
+        slot = self.__slots[self.__cursor]
+        if not slot:
+            return
+
+        remaining = []
+        expired = []
+        for handle in slot:
+            if handle.is_cancelled():
+                continue
+            if handle.tick():
+                expired.append(handle)
+            else:
+                remaining.append(handle)
+        self.__slots[self.__cursor] = remaining
+
+        for handle in expired:
+            # 同一槽中先触发的回调可能取消了后面的定时器，取消时已经减去了计数
+            if handle.is_cancelled():
+                continue
+            self.__pending -= 1
+            try:
+                handle.fire()
+            except Exception as e:
+                logger.opt(exception=e).error("定时器回调执行失败")
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.__tick
+        while True:
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+            # 事件循环繁忙时补上落后的刻度
+            while next_tick <= loop.time():
+                self.advance()
+                next_tick += self.__tick
+
+
+timer_wheel = TimerWheel(plugin_config.spy_game_timer_tick)
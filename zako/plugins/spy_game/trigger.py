@@ -0,0 +1,58 @@
+from enum import Enum, unique
+from nonebot.log import logger
+from .identity import Identity
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+
+@unique
+class MatchMode(Enum):
+    """
+    用于描述触发词汇判定方式的枚举类。
+    """
+    # 消息中出现词汇的任意一个字
+    CHAR = "char"
+    # 消息中出现完整的词汇
+    WORD = "word"
+    # 消息中出现与词汇任意一个字同音的字，需要安装 pypinyin
+    PINYIN = "pinyin"
+
+
+class TriggerMatcher:
+    """
+    开局时根据双方词汇预先构建的触发词汇判定器，每条消息只需遍历一次。
+    """
+
+    def __init__(self, words: dict[Identity, str], mode: MatchMode):
+        if mode == MatchMode.PINYIN and lazy_pinyin is None:
+            logger.warning("未安装 pypinyin，触发词汇判定退回为单字匹配")
+            mode = MatchMode.CHAR
+
+        self.__mode = mode
+        match mode:
+            case MatchMode.CHAR:
+                self.__patterns = {identity: frozenset(word) for identity, word in words.items()}
+            case MatchMode.WORD:
+                self.__patterns = dict(words)
+            case MatchMode.PINYIN:
+                self.__patterns = {identity: frozenset(lazy_pinyin(word)) for identity, word in words.items()}
+
+    def get_mode(self) -> MatchMode:
+        return self.__mode
+
+    def match(self, identity: Identity, message: str) -> bool:
+        pattern = self.__patterns.get(identity)
+        # 白板没有词汇，不会触发
+        if pattern is None:
+            return False
+        match self.__mode:
+            case MatchMode.CHAR:
+                return not pattern.isdisjoint(message)
+            case MatchMode.WORD:
+                return pattern in message
+            case MatchMode.PINYIN:
+                return not pattern.isdisjoint(lazy_pinyin(message))
+        return False
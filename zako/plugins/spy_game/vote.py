@@ -0,0 +1,124 @@
+from typing import Callable, Iterable, Optional
+from .timers import timer_wheel, TimerHandle
+
+
+class VoteRound:
+    """
+    一轮投票。投票时同步维护各票数对应的座位集合，
+    随时可以得到当前领先的座位以及是否平票，结算时无需重新统计。
+    最后一票投出或到达截止时间时自动结束，并调用 on_close。
+    """
+
+    def __init__(self,
+                 voters: Iterable[int],
+                 candidates: dict[int, int],
+                 on_close: Callable[["VoteRound"], None],
+                 changeable: bool = False,
+                 timeout: Optional[float] = None,
+                 executor: Callable[[Callable[[], None]], None] = lambda callback: callback()):
+        self.__voters = set(voters)
+        # 座位号 -> user_id
+        self.__candidates = candidates
+        self.__on_close = on_close
+        self.__changeable = changeable
+        # user_id -> 座位号，弃权为 None
+        self.__ballots: dict[int, Optional[int]] = {}
+        self.__tally: dict[int, int] = {seat: 0 for seat in candidates}
+        # 票数 -> 得到该票数的座位集合
+        self.__buckets: dict[int, set[int]] = {0: set(candidates)}
+        self.__max_votes = 0
+        self.__closed = False
+        self.__timer: Optional[TimerHandle] = None
+        if timeout:
+            # 截止时通过 executor 结束投票，以便与其他指令按顺序执行
+            self.__timer = timer_wheel.call_later(timeout, lambda: executor(self.close))
+
+    def get_voter_total(self):
+        return len(self.__voters)
+
+    def get_ballot_total(self):
+        return len(self.__ballots)
+
+    def get_ballots(self) -> dict[int, Optional[int]]:
+        return self.__ballots
+
+    def get_candidates(self) -> dict[int, int]:
+        return self.__candidates
+
+    def get_leaders(self) -> set[int]:
+        return self.__buckets[self.__max_votes]
+
+    def get_result(self) -> Optional[int]:
+        # 无人得票或平票时返回 None
+        if self.__max_votes == 0 or len(self.get_leaders()) > 1:
+            return None
+        return next(iter(self.get_leaders()))
+
+    def is_tie(self):
+        return self.__max_votes > 0 and len(self.get_leaders()) > 1
+
+    def is_closed(self):
+        return self.__closed
+
+    def vote(self, voter_id, seat: Optional[int]):
+        # 如果投票已经结束，返回1
+        if self.__closed:
+            return 1
+
+        # 如果不是本轮的投票者，返回2
+        if voter_id not in self.__voters:
+            return 2
+
+        # 如果已经投过票且不允许改票，返回3
+        voted = voter_id in self.__ballots
+        if voted and not self.__changeable:
+            return 3
+
+        # 如果投票目标不存在，返回4
+        if seat is not None and seat not in self.__candidates:
+            return 4
+
+        # 如果给自己投票，返回5
+        if seat is not None and self.__candidates[seat] == voter_id:
+            return 5
+
+        if voted:
+            self.__retract(self.__ballots[voter_id])
+        self.__ballots[voter_id] = seat
+        if seat is not None:
+            self.__move(seat, 1)
+
+        # 成功返回0，所有人都投票后结束本轮
+        if len(self.__ballots) == len(self.__voters):
+            self.close()
+        return 0
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        self.__on_close(self)
+
+    def __retract(self, seat: Optional[int]):
+        if seat is not None:
+            self.__move(seat, -1)
+
+    def __move(self, seat: int, delta: int):
+        count = self.__tally[seat]
+        bucket = self.__buckets[count]
+        bucket.discard(seat)
+        if not bucket and count != 0:
+            del self.__buckets[count]
+
+        count += delta
+        self.__tally[seat] = count
+        self.__buckets.setdefault(count, set()).add(seat)
+
+        # 票数只会逐票变化，领先票数最多变化 1
+        if count > self.__max_votes:
+            self.__max_votes = count
+        elif self.__max_votes not in self.__buckets:
+            self.__max_votes -= 1
@@ -0,0 +1,128 @@
+import json
+import asyncio
+from os import stat
+from random import choice
+from typing import KeysView, Optional
+from nonebot.log import logger
+from .config import plugin_config
+from .wordstore import WordPair, WordStore
+
+
+class WordIndex:
+    """
+    从 JSON 词库解析得到的内存索引，与 WordStore 提供相同的读取接口。
+    """
+
+    def __init__(self, categories: dict[str, tuple[WordPair, ...]]):
+        self.__categories = categories
+
+    def get_categories(self) -> KeysView[str]:
+        return self.__categories.keys()
+
+    def get_pair_total(self, category) -> int:
+        return len(self.__categories.get(category, ()))
+
+    def get_pair(self, category, index) -> WordPair:
+        return self.__categories[category][index]
+
+    def draw(self, category) -> Optional[WordPair]:
+        pairs = self.__categories.get(category)
+        if not pairs:
+            return None
+        return choice(pairs)
+
+    def close(self):
+        ...
+
+
+class WordLibrary:
+    """
+    词库服务，只加载一次词库文件，文件修改时间变化后在后台线程重新加载，并整体替换索引。
+    路径以 .bin 结尾时使用编译后的二进制词库（内存映射），否则解析 JSON 词库。
+    """
+
+    def __init__(self, path: str, interval: float = 5):
+        self.__path = path
+        self.__interval = interval
+        self.__mtime: Optional[float] = None
+        self.__index: WordIndex | WordStore = WordIndex({})
+        self.__task: Optional[asyncio.Task] = None
+
+    def get_index(self) -> WordIndex | WordStore:
+        if self.__mtime is None:
+            self.load()
+        return self.__index
+
+    def get_categories(self) -> KeysView[str]:
+        return self.get_index().get_categories()
+
+    def has_category(self, category) -> bool:
+        return category in self.get_categories()
+
+    def get_pair_total(self, category) -> int:
+        return self.get_index().get_pair_total(category)
+
+    def get_pair(self, category, index) -> WordPair:
+        return self.get_index().get_pair(category, index)
+
+    def draw(self, category) -> Optional[WordPair]:
+        return self.get_index().draw(category)
+
+    def load(self):
+        mtime = stat(self.__path).st_mtime
+        self.__replace(self.__open(), mtime)
+
+    async def reload(self):
+        try:
+            mtime = stat(self.__path).st_mtime
+        except OSError as e:
+            logger.warning(f"无法读取词库文件 {self.__path}: {e}")
+            return
+        if mtime == self.__mtime:
+            return
+
+        try:
+            index = await asyncio.to_thread(self.__open)
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"词库文件 {self.__path} 加载失败，继续使用旧词库: {e}")
+            return
+
+        self.__replace(index, mtime)
+        logger.info(f"词库已重新加载，共 {len(index.get_categories())} 个分类")
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__watch())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+        self.__index.close()
+
+    async def __watch(self):
+        while True:
+            await self.reload()
+            await asyncio.sleep(self.__interval)
+
+    def __replace(self, index: WordIndex | WordStore, mtime: float):
+        # 单次赋值替换索引，读取方不会看到加载到一半的词库
+        old_index = self.__index
+        self.__index = index
+        self.__mtime = mtime
+        old_index.close()
+
+    def __open(self) -> WordIndex | WordStore:
+        if self.__path.endswith(".bin"):
+            return WordStore(self.__path)
+
+        with open(self.__path, "r", encoding="utf-8") as file:
+            words: dict = json.load(file)
+
+        categories = {}
+        for category, pairs in words.items():
+            categories[category] = tuple((pair[0], pair[1]) for pair in pairs if len(pair) == 2)
+        return WordIndex(categories)
+
+
+word_library = WordLibrary(plugin_config.spy_game_word_path)
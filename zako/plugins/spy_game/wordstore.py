@@ -0,0 +1,126 @@
+import os
+import mmap
+import json
+from struct import Struct
+from random import randrange
+from typing import Iterable, KeysView, Optional
+
+WordPair = tuple[str, str]
+
+MAGIC = b"SPYW"
+VERSION = 1
+
+# 文件头: 魔数, 版本号, 分类数量
+HEADER = Struct("<4sHxxI")
+# 分类表: 名称偏移, 名称长度, 词对数量, 词对偏移表的位置
+CATEGORY = Struct("<IIII")
+# 词对偏移表中的一项
+OFFSET = Struct("<I")
+# 词对记录: 两个词的长度，之后紧跟两个词的 UTF-8 编码
+PAIR = Struct("<HH")
+
+
+class WordStore:
+    """
+    编译后的二进制词库，通过内存映射读取。
+    打开时只解析分类表，抽取词对时按偏移表直接定位到对应记录，
+    多个进程打开同一个文件时共享系统的页缓存。
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, category_total = HEADER.unpack_from(self.__mmap, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的词库文件: {path}")
+
+            # 分类名 -> (词对数量, 词对偏移表的位置)
+            self.__categories: dict[str, tuple[int, int]] = {}
+            for index in range(category_total):
+                name_offset, name_length, pair_total, offsets = CATEGORY.unpack_from(
+                    self.__mmap, HEADER.size + index * CATEGORY.size
+                )
+                name = self.__mmap[name_offset:name_offset + name_length].decode("utf-8")
+                self.__categories[name] = (pair_total, offsets)
+        except Exception:
+            self.__mmap.close()
+            raise
+
+    def get_categories(self) -> KeysView[str]:
+        return self.__categories.keys()
+
+    def get_pair_total(self, category) -> int:
+        return self.__categories.get(category, (0, 0))[0]
+
+    def get_pair(self, category, index) -> WordPair:
+        offsets = self.__categories[category][1]
+        (offset,) = OFFSET.unpack_from(self.__mmap, offsets + index * OFFSET.size)
+        first_length, second_length = PAIR.unpack_from(self.__mmap, offset)
+        start = offset + PAIR.size
+        middle = start + first_length
+        return (self.__mmap[start:middle].decode("utf-8"),
+                self.__mmap[middle:middle + second_length].decode("utf-8"))
+
+    def draw(self, category) -> Optional[WordPair]:
+        pair_total = self.get_pair_total(category)
+        if not pair_total:
+            return None
+        return self.get_pair(category, randrange(pair_total))
+
+    def close(self):
+        self.__mmap.close()
+
+
+def build(categories: dict[str, Iterable[WordPair]], path: str) -> int:
+    """
+    将各分类的词对编译为二进制词库，写入临时文件后整体替换，返回写入的词对数量。
+    """
+    encoded = {
+        name.encode("utf-8"): [(first.encode("utf-8"), second.encode("utf-8")) for first, second in pairs]
+        for name, pairs in categories.items()
+    }
+
+    # 依次排列: 文件头, 分类表, 分类名, 各分类的词对偏移表, 词对记录
+    position = HEADER.size + CATEGORY.size * len(encoded)
+    names = []
+    for name in encoded:
+        names.append(position)
+        position += len(name)
+    offset_tables = []
+    for pairs in encoded.values():
+        offset_tables.append(position)
+        position += OFFSET.size * len(pairs)
+
+    chunks = [HEADER.pack(MAGIC, VERSION, len(encoded))]
+    for (name, pairs), name_offset, offsets in zip(encoded.items(), names, offset_tables):
+        chunks.append(CATEGORY.pack(name_offset, len(name), len(pairs), offsets))
+    chunks.extend(encoded)
+
+    records = []
+    pair_total = 0
+    for pairs in encoded.values():
+        for first, second in pairs:
+            chunks.append(OFFSET.pack(position))
+            record = PAIR.pack(len(first), len(second)) + first + second
+            records.append(record)
+            position += len(record)
+            pair_total += 1
+    chunks.extend(records)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(b"".join(chunks))
+    os.replace(temp_path, path)
+    return pair_total
+
+
+def build_from_json(json_path: str, path: str) -> int:
+    with open(json_path, "r", encoding="utf-8") as file:
+        words: dict = json.load(file)
+
+    categories = {
+        category: [(pair[0], pair[1]) for pair in pairs if len(pair) == 2]
+        for category, pairs in words.items()
+    }
+    return build(categories, path)